@@ -0,0 +1,168 @@
+import os
+import sys
+import json
+import time
+import queue
+import threading
+import numpy as np
+from sample_buffer import SAMPLE_DTYPE, CSV_HEADERS
+
+# =============================================================================
+# AcquisitionLog: crash-safe, append-only binary log written during a sweep.
+#
+# File layout (*.ivlog):
+#   line 1: MAGIC
+#   line 2: JSON metadata (sweep parameters, start time, ...)
+#   rest:   packed SAMPLE_DTYPE records, appended in chunks
+#
+# append() only puts the sample on a queue; a background thread writes it out,
+# flushing and fsync-ing at chunk boundaries, so disk I/O never blocks the
+# acquisition thread. A crash loses at most the last unflushed chunk, and a
+# torn final record is ignored when reading.
+#
+# A log never replaces an existing file: if the path is taken (two sweeps
+# started within the same second) a _2, _3, ... suffix is added, and path holds
+# the name actually used. A failed write stops the log and is kept in error;
+# the sweep engine checks it and reports the failure.
+#
+#   python acquisition_log.py run.ivlog [run.csv]     converts a log to CSV
+# =============================================================================
+
+MAGIC = b"IVLOG1\n"
+LOG_EXTENSION = ".ivlog"
+_CLOSE = object()
+
+
+class AcquisitionLog:
+    def __init__(self, path, metadata=None, chunk_size=256, flush_interval=1.0):
+        """
+        Create the log file (at path or, if that exists, the next free suffixed
+        name) and start the writer thread.
+        Samples are flushed every chunk_size samples or flush_interval seconds.
+        """
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.error = None
+        self._queue = queue.Queue()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path, self._file = _create_exclusive(path)
+        self._file.write(MAGIC)
+        self._file.write(json.dumps(metadata or {}).encode() + b"\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        self._thread = threading.Thread(target=self._writer, name="AcquisitionLog", daemon=True)
+        self._thread.start()
+
+    def append(self, sample):
+        """
+        Queue one sample (tuple in SAMPLE_FIELDS order). Never blocks on disk.
+        """
+        self._queue.put(sample)
+
+    def close(self):
+        """
+        Write out everything still queued and close the file.
+        """
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+            self._thread.join()
+
+    def _write_chunk(self, samples):
+        if self.error is not None:
+            return
+        try:
+            self._file.write(np.array(samples, dtype=SAMPLE_DTYPE).tobytes())
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError as e:
+            self.error = e
+            print(f"Acquisition log error ({self.path}): {e}")
+
+    def _writer(self):
+        pending = []
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            if item is _CLOSE:
+                break
+            if item is not None:
+                pending.append(item)
+            if pending and (len(pending) >= self.chunk_size or
+                            time.monotonic() - last_flush >= self.flush_interval):
+                self._write_chunk(pending)
+                pending = []
+                last_flush = time.monotonic()
+        if pending:
+            self._write_chunk(pending)
+        self._file.close()
+
+
+def _create_exclusive(path):
+    """
+    Open a new file for writing at path, or at path with a _2, _3, ... suffix
+    before the extension if it exists. Returns (path used, file).
+    """
+    root, extension = os.path.splitext(path)
+    candidate, number = path, 1
+    while True:
+        try:
+            return candidate, open(candidate, "xb")
+        except FileExistsError:
+            number += 1
+            candidate = f"{root}_{number}{extension}"
+
+
+def read_acquisition_log(path):
+    """
+    Read a log (complete or cut short by a crash).
+    Returns (records, metadata) where records is a SAMPLE_DTYPE structured array.
+    """
+    with open(path, "rb") as f:
+        if f.readline() != MAGIC:
+            raise ValueError(f"{path} is not an acquisition log.")
+        metadata = json.loads(f.readline() or b"{}")
+        raw = f.read()
+    usable = len(raw) - len(raw) % SAMPLE_DTYPE.itemsize
+    return np.frombuffer(raw[:usable], dtype=SAMPLE_DTYPE), metadata
+
+
+def read_log_metadata(path):
+    """
+    Read only the metadata header of a log.
+    """
+    with open(path, "rb") as f:
+        if f.readline() != MAGIC:
+            raise ValueError(f"{path} is not an acquisition log.")
+        return json.loads(f.readline() or b"{}")
+
+
+def log_to_dataframe(path):
+    """
+    Load a log as a DataFrame with the same columns as the CSV export.
+    """
+    import pandas as pd  # not needed for logging, which must start fast
+    records, _ = read_acquisition_log(path)
+    return pd.DataFrame({CSV_HEADERS[name]: records[name] for name in CSV_HEADERS})
+
+
+def convert_log_to_csv(path, csv_path=None):
+    """
+    Write a log out as CSV (next to the log by default). Returns the CSV path.
+    """
+    if csv_path is None:
+        csv_path = os.path.splitext(path)[0] + ".csv"
+    log_to_dataframe(path).to_csv(csv_path, index=False)
+    return csv_path
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3):
+        print(f"usage: python {os.path.basename(__file__)} LOG{LOG_EXTENSION} [OUTPUT.csv]")
+        sys.exit(2)
+    print(convert_log_to_csv(*sys.argv[1:]))
@@ -0,0 +1,206 @@
+import time
+import numpy as np
+from multiprocessing import Process, Pipe
+from sample_buffer import SampleBuffer
+from sample_ring import SampleRing
+
+# =============================================================================
+# AnalysisProcess: one long-lived process that hosts the Tk analysis window.
+#
+# Starting the window used to cost a fresh Process per click: re-importing
+# tkinter, scipy, PIL and matplotlib, decoding every frame of starsmall.gif
+# and unpickling the data. Here the process is started once in the
+# background, builds the (hidden) window up front and then waits. Opening
+# the analysis window sends the (voltage, current) pairs as raw float64 bytes
+# over a pipe and the window is shown; closing it only hides it again.
+#
+# While a sweep runs, the main window also streams the new samples of the
+# shown data through a shared-memory SampleRing; the window's data, model
+# overlay and (optional) live fit are refreshed from it at most every
+# LIVE_UPDATE_S, without re-sending the history.
+#
+# Messages to the process: ("show", shape, epoch, seq, live) followed by the
+# data bytes (epoch and seq: the ring position the snapshot is current to;
+# live: update without raising the window), and
+# ("quit",). The process answers ("ready",) once the window is built and the
+# curve library the fits start from is loaded, or
+# ("error", message) if Tk cannot start (e.g. no display).
+# =============================================================================
+
+POLL_MS = 50              # how often the Tk loop checks the pipe and the ring
+LIVE_UPDATE_S = 0.5       # minimum interval between live redraws
+STARTUP_TIMEOUT = 30.0    # seconds to wait for the window to be built
+
+
+def serve(conn, ring_name):
+    """
+    Process entry point: build the analysis window hidden, show it with every
+    dataset received on conn and keep that dataset up to date from the ring.
+    """
+    import tkinter as tk
+    from GUIFinalRefactored import build_GUIFinal
+    from curve_library import get_library
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        conn.send(("error", f"Cannot open the analysis window: {e}"))
+        return
+    root.withdraw()
+    show_data = build_GUIFinal(root, persistent=True)
+    # Fits start from the curve library; load (or build) it before the window
+    # can be used rather than on the Tk thread at the first fit.
+    get_library()
+    ring = SampleRing(name=ring_name)
+    conn.send(("ready",))
+    data = SampleBuffer()
+    # Ring epoch and position the data is current to (None: nothing shown yet).
+    stream = {"epoch": None, "position": 0, "changed": False, "updated": 0.0}
+
+    def follow_ring():
+        if stream["epoch"] is None:
+            return
+        if ring.epoch != stream["epoch"]:
+            stream["epoch"], stream["position"] = ring.epoch, ring.epoch_start
+            data.clear()
+            stream["changed"] = True
+        voltages, currents, stream["position"], _ = ring.read(stream["position"])
+        if len(voltages):
+            data.extend(voltage=voltages, current=currents)
+            stream["changed"] = True
+        if stream["changed"] and time.monotonic() - stream["updated"] >= LIVE_UPDATE_S:
+            stream["changed"] = False
+            stream["updated"] = time.monotonic()
+            show_data(data.pairs(), live=True)
+
+    def poll():
+        try:
+            while conn.poll():
+                message = conn.recv()
+                if message[0] == "show":
+                    _, shape, stream["epoch"], stream["position"], live = message
+                    pairs = np.frombuffer(conn.recv_bytes(), dtype=np.float64).reshape(shape)
+                    data.clear()
+                    data.extend(voltage=pairs[:, 0], current=pairs[:, 1])
+                    stream["changed"] = False
+                    stream["updated"] = time.monotonic()
+                    show_data(data.pairs(), live=live)
+                elif message[0] == "quit":
+                    ring.close()
+                    root.destroy()
+                    return
+        except (EOFError, OSError):
+            # The main window is gone.
+            ring.close()
+            root.destroy()
+            return
+        follow_ring()
+        root.after(POLL_MS, poll)
+
+    root.after(POLL_MS, poll)
+    root.mainloop()
+
+
+class AnalysisProcess:
+    def __init__(self):
+        self.process = None
+        self.conn = None
+        self.ready = False
+        self.ring = None
+        # True once data has been shown in the running process.
+        self.shown = False
+
+    def start(self):
+        """
+        Start the analysis process in the background (if it is not running).
+        """
+        if self.process is not None and self.process.is_alive():
+            return
+        if self.ring is None:
+            self.ring = SampleRing()
+        self.conn, child_conn = Pipe()
+        self.process = Process(target=serve, args=(child_conn, self.ring.name), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self, timeout=STARTUP_TIMEOUT):
+        """
+        Wait until the window is built; raises RuntimeError if it cannot be.
+        """
+        if self.ready:
+            return
+        try:
+            if not self.conn.poll(timeout):
+                raise RuntimeError("The analysis window did not start.")
+            message = self.conn.recv()
+        except EOFError:
+            message = ("error", "The analysis process exited during startup.")
+        except RuntimeError:
+            self.stop()
+            raise
+        if message[0] == "error":
+            # Start afresh on the next attempt.
+            self.stop()
+            raise RuntimeError(message[1])
+        self.ready = True
+
+    def show(self, data, live=False):
+        """
+        Show the analysis window with data ((N, 2) voltage/current pairs),
+        restarting the process if it has exited. Samples streamed after this
+        call are added to it (see stream()). With live the window is only
+        updated, not raised (e.g. to resynchronize a stream that fell behind).
+        """
+        if self.process is None or not self.process.is_alive():
+            self.start()
+        self.wait_ready()
+        data = np.ascontiguousarray(data, dtype=np.float64)
+        try:
+            self.conn.send(("show", data.shape, self.ring.epoch, self.ring.seq, live))
+            self.conn.send_bytes(data)
+            self.shown = True
+        except OSError:
+            self.stop()
+            raise RuntimeError("The analysis process has exited; try again.") from None
+
+    def stream(self, voltages, currents):
+        """
+        Append new samples of the shown data to the live stream.
+        """
+        if self.ring is not None:
+            self.ring.extend(voltages, currents)
+
+    def reset_stream(self):
+        """
+        The shown data was replaced (new sweep or file): the window starts over
+        with the samples streamed from now on.
+        """
+        if self.ring is not None:
+            self.ring.reset()
+
+    def stop(self):
+        """
+        Ask the process to exit and wait for it.
+        """
+        if self.process is None:
+            return
+        try:
+            self.conn.send(("quit",))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        self.process = None
+        self.shown = False
+
+    def close(self):
+        """
+        Stop the process and free the stream.
+        """
+        self.stop()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring.unlink()
+            self.ring = None
@@ -0,0 +1,58 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# =============================================================================
+# AsyncSMU4201: asyncio front end for an SMU4201.
+#
+# pyvisa calls block, so every command runs on one dedicated I/O thread, in
+# the order it was submitted (the executor queue is the command queue). The
+# sweep coroutine can queue the next command before it awaits the current
+# one, and awaiting can be cancelled or timed out at any moment, so pause and
+# stop do not have to wait for a polling interval. An I/O call that is
+# already on the wire still completes on the I/O thread; later commands run
+# after it, which keeps the instrument's command stream consistent.
+# =============================================================================
+
+IO_TIMEOUT = 30.0         # seconds an awaited instrument call may take
+
+
+class AsyncSMU4201:
+    def __init__(self, smu, timeout=IO_TIMEOUT):
+        """
+        Wrap an SMU4201. Its methods must then only be called through this object.
+        """
+        self.smu = smu
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smu-io")
+
+    def submit(self, method, *args, **kwargs):
+        """
+        Queue method(*args, **kwargs) (an SMU4201 method) on the I/O thread and
+        return an asyncio future without waiting for it.
+        """
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    async def wait(self, future, timeout=None, name="instrument call"):
+        """
+        Await a submitted call, raising TimeoutError after timeout seconds
+        (self.timeout by default).
+        """
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{name} timed out after {timeout:g} s") from None
+
+    async def call(self, method, *args, timeout=None, **kwargs):
+        """
+        Submit a call and await its result.
+        """
+        return await self.wait(self.submit(method, *args, **kwargs), timeout, method.__name__)
+
+    def close(self):
+        """
+        Wait for queued commands to finish and stop the I/O thread.
+        """
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,153 @@
+import os
+import sys
+import csv
+import time
+import argparse
+import numpy as np
+from multiprocessing import Pool, cpu_count
+from langmuir_fit import fit_sweep
+from curve_library import get_library, match_sweep
+from run_file import RunFile, RUN_EXTENSION
+
+# =============================================================================
+# batch_fit: headless plasma-parameter extraction over a directory of sweeps.
+#
+#   python batch_fit.py DATA_DIR --length 12.7 --radius 0.8 -o summary.csv
+#
+# Every "Voltage (V),Current (A)" CSV under DATA_DIR (as written by
+# MainWindow.save_data_to_csv) is fitted in a worker process; results are
+# streamed into one summary CSV as they complete. Use --pattern .ivrun to
+# process run files instead, and --match-only to report the closest curve of
+# the precomputed model library (curve_library.py) without fitting.
+# =============================================================================
+
+VOLTAGE_COLUMN = "Voltage (V)"
+CURRENT_COLUMN = "Current (A)"
+
+SUMMARY_FIELDS = ["file", "points", "T_ev", "n_e", "V_f", "V_P", "Xi", "rmse",
+                  "success", "nfev", "distance", "edge", "load_time", "fit_time", "total_time", "error"]
+
+
+def load_sweep_csv(path):
+    """
+    Load a saved sweep CSV and return an (N, 2) array of voltage/current pairs.
+    """
+    with open(path, newline="") as f:
+        header = next(csv.reader(f), [])
+    header = [h.strip() for h in header]
+    if VOLTAGE_COLUMN not in header or CURRENT_COLUMN not in header:
+        raise ValueError(f"CSV does not contain required columns '{VOLTAGE_COLUMN}' and '{CURRENT_COLUMN}'.")
+    usecols = (header.index(VOLTAGE_COLUMN), header.index(CURRENT_COLUMN))
+    return np.loadtxt(path, delimiter=",", skiprows=1, usecols=usecols, ndmin=2)
+
+
+def load_sweep(path):
+    """
+    Load voltage/current pairs from a sweep CSV or a run file.
+    """
+    if path.endswith(RUN_EXTENSION):
+        return RunFile(path).pairs()
+    return load_sweep_csv(path)
+
+
+def find_sweep_files(root, pattern=".csv", exclude=None):
+    """
+    Yield every file under root whose name ends with pattern (case-insensitive),
+    in sorted order, except the file exclude (e.g. the summary being written).
+    """
+    pattern = pattern.lower()
+    exclude = os.path.abspath(exclude) if exclude is not None else None
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            if name.lower().endswith(pattern) and os.path.abspath(path) != exclude:
+                yield path
+
+
+def fit_file(job):
+    """
+    Worker: load and fit one file. Never raises; failures are reported in the row.
+    """
+    path, L, R, v_range, match_only = job
+    row = {"file": path}
+    start = time.perf_counter()
+    try:
+        data = load_sweep(path)
+        row["points"] = len(data)
+        row["load_time"] = time.perf_counter() - start
+        if match_only:
+            if v_range is not None:
+                data = data[(data[:, 0] >= min(v_range)) & (data[:, 0] <= max(v_range))]
+            row.update(match_sweep(data, L, R))
+            row["fit_time"] = row.pop("match_time")
+        else:
+            row.update(fit_sweep(data, L, R, v_range=v_range))
+    except Exception as e:
+        row["error"] = str(e)
+    row["total_time"] = time.perf_counter() - start
+    return row
+
+
+def run_batch(root, L, R, output, v_range=None, workers=None, pattern=".csv", match_only=False):
+    """
+    Fit (or with match_only, match to the curve library) every sweep under
+    root in a process pool, streaming rows to output.
+    Returns (number of files, number of failures).
+    """
+    jobs = [(path, L, R, v_range, match_only) for path in find_sweep_files(root, pattern, exclude=output)]
+    if not jobs:
+        print(f"No '{pattern}' files found under {root}")
+        return 0, 0
+
+    # Load (or build) the curve library the fits start from once, before the
+    # workers are started, so they do not all build it at the same time.
+    get_library()
+    workers = workers or cpu_count()
+    chunksize = max(1, len(jobs) // (workers * 16))
+    failures = 0
+    start = time.perf_counter()
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        with Pool(workers) as pool:
+            for done, row in enumerate(pool.imap_unordered(fit_file, jobs, chunksize=chunksize), 1):
+                writer.writerow(row)
+                if row.get("error"):
+                    failures += 1
+                    print(f"[{done}/{len(jobs)}] {row['file']}: {row['error']}", file=sys.stderr)
+                if done % 100 == 0 or done == len(jobs):
+                    f.flush()
+                    elapsed = time.perf_counter() - start
+                    print(f"[{done}/{len(jobs)}] {elapsed:.1f} s, {done / elapsed:.1f} files/s")
+    return len(jobs), failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit Te, ne and Vf for every saved sweep CSV under a directory.")
+    parser.add_argument("directory", help="root directory to search for sweep files")
+    parser.add_argument("--length", type=float, required=True, help="probe length (mm)")
+    parser.add_argument("--radius", type=float, required=True, help="probe radius (mm), as entered in the analysis window")
+    parser.add_argument("-o", "--output", default="fit_summary.csv", help="summary CSV to write (default: fit_summary.csv)")
+    parser.add_argument("--v-min", type=float, help="lower bias limit of the fit window (V)")
+    parser.add_argument("--v-max", type=float, help="upper bias limit of the fit window (V)")
+    parser.add_argument("-j", "--workers", type=int, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--pattern", default=".csv", help="file name suffix to match (default: .csv)")
+    parser.add_argument("--match-only", action="store_true",
+                        help="report the closest precomputed model curve instead of fitting")
+    args = parser.parse_args(argv)
+
+    v_range = None
+    if args.v_min is not None or args.v_max is not None:
+        v_range = (-np.inf if args.v_min is None else args.v_min,
+                   np.inf if args.v_max is None else args.v_max)
+
+    total, failures = run_batch(args.directory, args.length, args.radius, args.output,
+                                v_range=v_range, workers=args.workers, pattern=args.pattern,
+                                match_only=args.match_only)
+    print(f"Fitted {total - failures}/{total} files -> {args.output}")
+    return 1 if failures and failures == total else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,263 @@
+import os
+import sys
+import json
+import time
+import argparse
+from collections import defaultdict
+import numpy as np
+from PyQt5 import QtCore
+from main import SweepWorker
+from smu4201 import SMU4201
+from simulated_smu import SimulatedSMU4201
+from batch_fit import load_sweep
+
+# =============================================================================
+# benchmark: acquisition throughput of SweepWorker against a simulated SMU4201.
+#
+#   python benchmark.py                      run all cases, compare to the baseline
+#   python benchmark.py --save-baseline      record a new baseline
+#   python benchmark.py --recorded run.csv   replay a recorded sweep instead of the model
+#
+# Every case runs a real SweepWorker on its own QThread, with the samples
+# delivered to the main thread through the new_data signal, as in the GUI.
+# Reported per case: points/s, per-point latency (interval between samples,
+# p50/p99), Qt signal delivery latency and the time spent in each phase of
+# the acquisition loop (configure, HV mode, set voltage, settle, measure,
+# list run, plus the worker's own overhead). Phase times are exclusive: time
+# spent in measure() is not counted again in settle.
+#
+# The exit code is 1 if points/s or p99 latency regressed by more than the
+# tolerance against benchmark_baseline.json.
+# =============================================================================
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+TOLERANCE = 0.2
+LATENCY_SLACK_MS = 1.0    # absolute p99 slack, so sub-millisecond jitter is not a regression
+
+SWEEP = {"current_limit": 0.01, "min_voltage": 40.0, "max_voltage": 70.0, "sensitivity": 5e-6}
+CASES = {
+    "adaptive": {"mode": "adaptive"},
+    "adaptive_curvature": {"mode": "adaptive", "planner": "curvature"},
+    "list": {"mode": "list", "list_step": 0.25, "dwell": 0.001},
+    "refine": {"mode": "refine", "dwell": 0.001},
+    "adaptive_repeat": {"mode": "adaptive", "repeat": 2, "bidirectional": True},
+}
+
+# SMU4201 method -> phase it is accounted to.
+PHASES = {
+    "reset": "configure",
+    "set_source_voltage_mode": "configure",
+    "set_current_limit": "configure",
+    "set_current_range_auto": "configure",
+    "set_measure_functions": "configure",
+    "wait_complete": "configure",
+    "set_output": "configure",
+    "set_hv_mode": "hv_mode",
+    "set_voltage": "set_voltage",
+    "source_and_settle": "settle",
+    "wait_settled": "settle",
+    "measure": "measure",
+    "run_list": "list_run",
+}
+
+
+class PhaseTimer:
+    def __init__(self):
+        """
+        Exclusive wall time per phase (time in nested timed calls is subtracted).
+        """
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        self._stack = []
+
+    def wrap(self, phase, method):
+        def timed(*args, **kwargs):
+            self._stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.totals[phase] += elapsed - self._stack.pop()
+                self.counts[phase] += 1
+                if self._stack:
+                    self._stack[-1] += elapsed
+        return timed
+
+
+def instrument_phases(smu, timer):
+    """
+    Route the SMU4201 methods listed in PHASES through timer.
+    """
+    for name, phase in PHASES.items():
+        setattr(smu, name, timer.wrap(phase, getattr(smu, name)))
+
+
+class BenchmarkWorker(SweepWorker):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.emit_times = []
+        self.run_time = 0.0
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        start = time.perf_counter()
+        super().run()
+        self.run_time = time.perf_counter() - start
+
+    def emit_sample(self, sample):
+        self.emit_times.append(time.perf_counter())
+        super().emit_sample(sample)
+
+
+class Receiver(QtCore.QObject):
+    def __init__(self):
+        """
+        Main-thread end of the new_data signal; records the arrival times.
+        """
+        super().__init__()
+        self.arrival_times = []
+        self.errors = []
+
+    @QtCore.pyqtSlot(tuple)
+    def receive(self, sample):
+        self.arrival_times.append(time.perf_counter())
+
+    @QtCore.pyqtSlot(str)
+    def error(self, message):
+        self.errors.append(message)
+
+
+def percentiles_ms(values):
+    if len(values) == 0:
+        return None, None
+    p50, p99 = np.percentile(values, [50, 99]) * 1e3
+    return round(float(p50), 3), round(float(p99), 3)
+
+
+def run_case(name, settings, instrument_options):
+    """
+    Run one sweep case on a fresh simulated instrument; returns its metrics.
+    """
+    timer = PhaseTimer()
+    smu = SMU4201(SimulatedSMU4201(**instrument_options))
+    instrument_phases(smu, timer)
+    worker = BenchmarkWorker(smu, **SWEEP, **settings)
+    receiver = Receiver()
+    thread = QtCore.QThread()
+    worker.moveToThread(thread)
+    worker.new_data.connect(receiver.receive)
+    worker.error.connect(receiver.error)
+    loop = QtCore.QEventLoop()
+    worker.finished.connect(loop.quit)
+    thread.started.connect(worker.run)
+    thread.start()
+    loop.exec_()
+    thread.quit()
+    thread.wait()
+    QtCore.QCoreApplication.processEvents()
+    if receiver.errors:
+        raise RuntimeError(f"{name}: {receiver.errors[0]}")
+
+    emit_times = np.array(worker.emit_times)
+    arrivals = np.array(receiver.arrival_times[:len(emit_times)])
+    points = len(emit_times)
+    phases = {phase: round(total, 4) for phase, total in sorted(timer.totals.items())}
+    phases["worker"] = round(worker.run_time - sum(timer.totals.values()), 4)
+    sweep_time = worker.run_time - timer.totals["configure"]
+    p50, p99 = percentiles_ms(np.diff(emit_times))
+    d50, d99 = percentiles_ms(arrivals - emit_times[:len(arrivals)])
+    return {
+        "points": points,
+        "run_time_s": round(worker.run_time, 4),
+        "points_per_s": round(points / sweep_time, 2) if sweep_time > 0 else None,
+        "point_latency_p50_ms": p50,
+        "point_latency_p99_ms": p99,
+        "delivery_latency_p50_ms": d50,
+        "delivery_latency_p99_ms": d99,
+        "phases_s": phases,
+    }
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Return a list of regression messages (empty if none).
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get("cases", {}).get(name)
+        if not reference:
+            continue
+        if result["points_per_s"] < reference["points_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['points_per_s']} points/s "
+                               f"(baseline {reference['points_per_s']})")
+        if (reference["point_latency_p99_ms"] is not None and
+                result["point_latency_p99_ms"] >
+                reference["point_latency_p99_ms"] * (1 + tolerance) + LATENCY_SLACK_MS):
+            regressions.append(f"{name}: p99 latency {result['point_latency_p99_ms']} ms "
+                               f"(baseline {reference['point_latency_p99_ms']} ms)")
+    return regressions
+
+
+def print_report(results, baseline):
+    reference = baseline.get("cases", {})
+    for name, result in results.items():
+        base = reference.get(name, {}).get("points_per_s")
+        change = f" ({(result['points_per_s'] / base - 1) * 100:+.1f} % vs baseline)" if base else ""
+        print(f"{name}: {result['points']} points in {result['run_time_s']:.3f} s, "
+              f"{result['points_per_s']} points/s{change}")
+        print(f"  per point  p50 {result['point_latency_p50_ms']} ms  p99 {result['point_latency_p99_ms']} ms")
+        print(f"  delivery   p50 {result['delivery_latency_p50_ms']} ms  p99 {result['delivery_latency_p99_ms']} ms")
+        print("  phases     " + "  ".join(f"{phase} {total:.3f}s" for phase, total in result["phases_s"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sweep acquisition against a simulated SMU4201.")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--recorded", help="replay a recorded sweep (CSV or run file) instead of the model")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="scale of the simulated delays")
+    parser.add_argument("--noise", type=float, default=0.0, help="relative current noise")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication(sys.argv)
+    instrument_options = {"time_scale": args.time_scale, "noise": args.noise, "seed": 0}
+    if args.recorded:
+        data = load_sweep(args.recorded)
+        instrument_options["curve"] = (data[:, 0], data[:, 1])
+
+    results = {name: run_case(name, CASES[name], instrument_options) for name in args.cases}
+    settings = {"instrument": {k: v for k, v in instrument_options.items() if k != "curve"},
+                "recorded": args.recorded, "sweep": SWEEP}
+    output = {"settings": settings, "cases": results}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    comparable = baseline.get("settings") == settings
+    print_report(results, baseline if comparable else {})
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(output, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(output, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not comparable:
+        print("Baseline was recorded with different settings; not compared.")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+import os
+import time
+import zipfile
+import numpy as np
+from scipy.spatial import cKDTree
+from langmuir_model import LangmuirModel, XI_PLANAR, e, m_i, eps_0, _as_columns, zero_crossing
+
+###########################################################################################
+
+# Library of precomputed model IV curves, matched to a sweep in about a millisecond.
+#
+# Plotted against the distance from its zero crossing, a model curve divided by I_is
+# depends only on T_ev and Xi: the ion current is a function of (V_f - V) / T_iv, the
+# electron current of (V - V_P) with V_P - V_f proportional to T_ev, and n_e and the probe
+# area only enter through I_is and Xi. The library therefore holds I / I_is for a
+# (T_ev, Xi) grid at the offsets U from each curve's zero crossing, as float32, built into
+# curve_library.npz on first use (about 1 MB, well under a second).
+#
+# A sweep is resampled at its own zero crossing + U; every curve is scaled by its mean |I|
+# on the ion side (U <= ION_SIDE) and compressed with asinh, and the nearest library curve
+# is looked up in a KD-tree. T_ev comes from that curve, V_f from the crossing plus the
+# curve's offset, n_e from the ion-side scale and the probe area. A sweep that does not
+# span all of U is compared on the offsets it covers, by a direct scan (scaled by its
+# first volt if it starts less than -ION_SIDE below the crossing).
+#
+# The planar electron-sheath branch (Xi >= XI_PLANAR) is undefined above V_P, so the
+# library stops short of it.
+
+###########################################################################################
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LIBRARY_PATH = os.path.join(BASE_DIR, "curve_library.npz")
+
+LIBRARY_VERSION = 2
+T_EV_RANGE = (0.1, 20.0)       # eV, log-spaced
+XI_RANGE = (0.05, XI_PLANAR)   # probe radius / Debye length, log-spaced
+N_T_EV = 96
+N_XI = 32
+U = np.linspace(-10.0, 10.0, 81)   # bias offsets from the zero crossing (V)
+ION_SIDE = -5.0                    # offsets at or below this set a curve's scale
+MIN_POINTS = 8                     # covered offsets needed to match a partial sweep
+
+# Any geometry gives the same I / I_is; n_e is chosen to give the wanted Xi.
+_L, _R = 10.0, 1.0
+
+
+def _crossings(model, low=-5.0, high=0.0, tolerance=1e-6):
+    """
+    Zero crossing of the total current of every curve of model (parameters of
+    shape (P, 1)) between V_f + low and V_f + high, by bisection on all curves at
+    once: below V_f the current rises monotonically through zero.
+    """
+    shape = np.broadcast(model.T_ev, model.n_e).shape
+    low, high = np.full(shape, low), np.full(shape, high)
+    while np.max(high - low) > tolerance:
+        middle = (low + high) / 2
+        below = model.total_current(middle) < 0
+        low = np.where(below, middle, low)
+        high = np.where(below, high, middle)
+    return ((low + high) / 2)[:, 0]
+
+
+def build_library(t_ev_range=T_EV_RANGE, xi_range=XI_RANGE, n_t_ev=N_T_EV, n_xi=N_XI):
+    """
+    Tabulate I / I_is at the offsets U for every (T_ev, Xi) of the grid.
+    Returns (T_ev, Xi, offset, currents), offset = V_f - zero crossing.
+    """
+    T_ev, Xi = np.meshgrid(np.geomspace(*t_ev_range, n_t_ev),
+                           np.geomspace(*xi_range, n_xi, endpoint=False), indexing="ij")
+    T_ev, Xi = T_ev.ravel(), Xi.ravel()
+    n_e = eps_0 * T_ev * Xi**2 / (e * (_R * 1e-3)**2)
+    model = LangmuirModel(T_ev[:, None], n_e[:, None], _L, _R, 0.0)
+
+    # The crossing lies a little below V_f, where the ion current sets in.
+    crossing = _crossings(model)
+    currents = model.total_current(crossing[:, None] + U) / model.I_is
+    return T_ev, Xi, -crossing, currents.astype(np.float32)
+
+
+def _load_or_build(path=LIBRARY_PATH):
+    try:
+        with np.load(path) as cached:
+            if int(cached["version"]) == LIBRARY_VERSION and np.array_equal(cached["U"], U):
+                return cached["T_ev"], cached["Xi"], cached["offset"], cached["currents"]
+    except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+        pass
+
+    T_ev, Xi, offset, currents = build_library()
+    # Written under a temporary name and renamed, so a process loading the
+    # library at the same time never sees a partial file.
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            np.savez(f, version=LIBRARY_VERSION, U=U, T_ev=T_ev, Xi=Xi, offset=offset, currents=currents)
+        os.replace(temporary, path)
+    except OSError as e:
+        print(f"Could not cache curve library to {path}: {e}")
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+    return T_ev, Xi, offset, currents
+
+
+def _features(currents, ion_side):
+    """
+    Scale-free curve shapes: asinh of each row over its mean |I| on the ion side.
+    Returns (features, scales).
+    """
+    scales = np.abs(currents[:, ion_side]).mean(axis=1)
+    return np.arcsinh(currents / scales[:, None]), scales
+
+
+class CurveLibrary:
+    def __init__(self, T_ev, Xi, offset, currents):
+        """
+        Index the tabulated curves (see build_library) for nearest-neighbour lookups.
+        """
+        self.T_ev = T_ev
+        self.Xi = Xi
+        self.offset = offset
+        self.currents = currents
+        # Curves on the border of the (T_ev, Xi) grid: a match there may lie outside it.
+        self.edge = ((T_ev == T_ev.min()) | (T_ev == T_ev.max()) |
+                     (Xi == Xi.min()) | (Xi == Xi.max()))
+        self.features, self.scales = _features(currents, U <= ION_SIDE)
+        self.tree = cKDTree(self.features)
+
+    def __len__(self):
+        return len(self.T_ev)
+
+    def nearest(self, V, I):
+        """
+        Index of the closest library curve, its distance (RMS difference of the
+        compressed curves over the compared offsets), the sweep's zero
+        crossing and its ion saturation current I_is (A) by that curve.
+        Raises ValueError if the sweep cannot be matched.
+        """
+        if not ((I[:-1] < 0) & (I[1:] >= 0)).any():
+            raise ValueError("Sweep has no zero crossing to match the library at.")
+        crossing = zero_crossing(V, I)
+
+        covered = (crossing + U >= V[0]) & (crossing + U <= V[-1])
+        if covered.sum() < MIN_POINTS:
+            raise ValueError("Sweep does not extend far enough around its zero crossing.")
+        ion_side = covered & (U <= ION_SIDE)
+        if not ion_side.any():
+            # Short ion side: scale by its first volt instead.
+            ion_side = covered & (U < min(0.0, U[covered][0] + 1.0))
+        if not ion_side.any():
+            raise ValueError("Sweep does not extend below its zero crossing.")
+        measured = np.interp(crossing + U[covered], V, I)
+        scale = np.abs(measured[ion_side[covered]]).mean()
+        shape = np.arcsinh(measured / scale)
+        if covered.all():
+            distance, index = self.tree.query(shape)
+            return int(index), float(distance / np.sqrt(len(U))), crossing, scale / self.scales[index]
+        # Partial sweep: compare on the covered offsets, with the ion-side scale
+        # taken over the same offsets.
+        features, scales = _features(self.currents[:, covered], ion_side[covered])
+        distances = np.mean((features - shape)**2, axis=1)
+        index = int(np.argmin(distances))
+        return index, float(np.sqrt(distances[index])), crossing, scale / scales[index]
+
+    def match(self, measured_data, L, R):
+        """
+        Plasma parameters of the library curve closest to measured (voltage, current)
+        pairs, for a probe of length L and radius R (mm). Returns a dict with T_ev, n_e,
+        V_f, V_P, Xi, the RMSE of that model against the data, the distance in the
+        library, whether the curve lies on the border of the grid ("edge") and the
+        match time. Raises ValueError if the sweep cannot be matched.
+        """
+        start = time.perf_counter()
+        V, I = _as_columns(measured_data)
+        index, distance, crossing, I_is = self.nearest(V, I)
+        T_ev = float(self.T_ev[index])
+        S = 2*np.pi*R*L*1e-6
+        n_e = float(I_is / (.6 * e * np.sqrt(T_ev*e/m_i) * S))
+        V_f = float(crossing + self.offset[index])
+        model = LangmuirModel(T_ev, n_e, L, R, V_f)
+        with np.errstate(over="ignore", invalid="ignore"):
+            residuals = model.total_current(V) - I
+        return {
+            "T_ev": T_ev,
+            "n_e": n_e,
+            "V_f": V_f,
+            "V_P": float(model.V_P),
+            "Xi": float(model.Xi),
+            "rmse": float(np.sqrt(np.nanmean(residuals**2))),
+            "distance": distance,
+            "edge": bool(self.edge[index]),
+            "match_time": time.perf_counter() - start,
+        }
+
+
+_library = None
+
+
+def get_library():
+    """
+    Return the curve library, loading it from disk (or building it) on first use.
+    """
+    global _library
+    if _library is None:
+        _library = CurveLibrary(*_load_or_build())
+    return _library
+
+
+def match_sweep(measured_data, L, R):
+    """
+    Nearest library curve for measured (voltage, current) pairs; see CurveLibrary.match.
+    """
+    return get_library().match(measured_data, L, R)
@@ -0,0 +1,216 @@
+import time
+import numpy as np
+from scipy.optimize import least_squares
+from langmuir_model import LangmuirModel, e, m_i, m_e, _as_columns, zero_crossing
+from curve_library import match_sweep
+
+###########################################################################################
+
+# Automatic extraction of T_ev, n_e and V_f from a measured IV sweep.
+#
+# The free parameters are fitted with scipy's least_squares in (T_ev, ln n_e, V_f).
+# The Jacobian is a forward difference, but all perturbed parameter sets are pushed
+# through LangmuirModel in a single broadcast call, so one Jacobian costs one model call.
+# The model has several local minima, so the fit is run from more than one start:
+# the closest curve of the precomputed library (curve_library.py) and the estimates
+# from the raw data; the result with the lowest RMSE is kept.
+
+###########################################################################################
+
+T_EV_BOUNDS = (0.05, 50.0)
+N_E_BOUNDS = (1e8, 1e22)
+MASK_PASSES = 3            # fits on the points where the model is defined (planar sheath)
+
+
+def retarding_slope_temperature(V, I, V_f, window=5):
+    """
+    Electron temperature estimate from the exponential (electron-retarding) region:
+    1 / (steepest slope of ln(I - I_ion)) above the floating potential.
+    """
+    I_ion = min(I.min(), 0.0)
+    above = (V >= V_f) & (I - I_ion > 0)
+    V_e, lnI_e = V[above], np.log(I[above] - I_ion)
+    if len(V_e) < window:
+        return 1.0
+
+    # Least-squares slope over a sliding window, all windows at once.
+    idx = np.arange(len(V_e) - window + 1)[:, None] + np.arange(window)
+    Vw, yw = V_e[idx], lnI_e[idx]
+    Vc = Vw - Vw.mean(axis=1, keepdims=True)
+    denom = (Vc**2).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slopes = (Vc * (yw - yw.mean(axis=1, keepdims=True))).sum(axis=1) / denom
+    slopes = slopes[np.isfinite(slopes) & (slopes > 0)]
+    if len(slopes) == 0:
+        return 1.0
+    return float(np.clip(1 / slopes.max(), *T_EV_BOUNDS))
+
+
+def initial_guess(measured_data, L, R):
+    """
+    Data-derived starting point (T_ev, n_e, V_f) for the fit.
+    """
+    V, I = _as_columns(measured_data)
+    V_f = zero_crossing(V, I)
+    T_ev = retarding_slope_temperature(V, I, V_f)
+
+    # Density from the electron current at the plasma potential, taken at the
+    # steepest rise of the current above V_f (the knee). The slope estimate of
+    # T_ev is often low, and V_P computed from it lies well down the exponential.
+    # Falls back to the ion saturation current if there is no rise above V_f.
+    S = 2*np.pi*R*L*1e-6
+    I_e = I - min(I.min(), 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rise = np.gradient(I, V) if len(V) >= 2 else np.zeros_like(V)
+    rise = np.where((V > V_f) & np.isfinite(rise), rise, 0.0)
+    if rise.max() > 0:
+        knee = np.argmax(rise)
+        n_e = I_e[knee] / (e * S * np.sqrt((T_ev*e)/(2*np.pi*m_e)))
+    else:
+        n_e = -min(I.min(), -1e-12) / (.6 * e * np.sqrt(T_ev*e/m_i) * S)
+    n_e = float(np.clip(n_e, *N_E_BOUNDS))
+    return T_ev, n_e, float(V_f)
+
+
+def starting_points(measured_data, L, R):
+    """
+    Starting points (T_ev, n_e, V_f) for the fit: the closest precomputed model
+    curve (if the sweep can be matched to the library at all) and initial_guess().
+    A match on the border of the library grid or far from every curve is still
+    used; fit_sweep keeps whichever start fits best.
+    """
+    starts = [initial_guess(measured_data, L, R)]
+    try:
+        match = match_sweep(measured_data, L, R)
+    except ValueError:
+        return starts
+    starts.insert(0, (match["T_ev"], match["n_e"], match["V_f"]))
+    return starts
+
+
+def _defined(V, p, L, R):
+    """
+    Mask of the biases V at which the model with parameters p = (T_ev, ln n_e, V_f)
+    is defined.
+    """
+    with np.errstate(over="ignore", invalid="ignore"):
+        return np.isfinite(LangmuirModel(p[0], np.exp(p[1]), L, R, p[2]).total_current(V))
+
+
+def _least_squares(V, I, L, R, p0, bounds):
+    """
+    least_squares fit of (T_ev, ln n_e, V_f) to (V, I), from p0.
+    """
+    scale = np.abs(I).max() or 1.0
+    steps = np.array([1e-4, 1e-4, 1e-4])
+
+    def model_batch(p):
+        # Row 0 is p itself; rows 1..3 perturb one parameter each.
+        P = np.tile(p, (4, 1))
+        P[1:] += np.diag(steps * np.maximum(np.abs(p), 1.0))
+        model = LangmuirModel(P[:, 0:1], np.exp(P[:, 1:2]), L, R, P[:, 2:3])
+        with np.errstate(over="ignore", invalid="ignore"):
+            f = model.total_current(V)
+        # Points that become undefined during the fit carry no weight; fit_sweep
+        # refits without them.
+        return np.where(np.isfinite(f), (f - I) / scale, 0.0), P
+
+    cache = {}
+
+    def evaluate(p):
+        key = p.tobytes()
+        if key not in cache:
+            cache.clear()
+            cache[key] = model_batch(p)
+        return cache[key]
+
+    def residuals(p):
+        return evaluate(p)[0][0]
+
+    def jacobian(p):
+        r, P = evaluate(p)
+        h = np.diag(P[1:] - P[0])
+        return ((r[1:] - r[0]) / h[:, None]).T
+
+    return least_squares(residuals, p0, jac=jacobian, bounds=bounds)
+
+
+def _fit_from(V, I, L, R, p0, bounds):
+    """
+    Fit from the start p0 = (T_ev, ln n_e, V_f). The planar-sheath branch is
+    undefined above V_P: the fit uses only the points where the model at its
+    starting point is defined, and is repeated from its result while that leaves
+    out different points. Returns a dict with the parameters p, the RMSE over the
+    points where the fitted model is defined, success and nfev.
+    """
+    p, nfev, fitted = p0, 0, None
+    for _ in range(MASK_PASSES):
+        defined = _defined(V, p, L, R)
+        if fitted is not None and np.array_equal(defined, fitted):
+            break
+        if defined.sum() < 4:
+            if fitted is not None:
+                break
+            raise ValueError("Need at least 4 data points where the model is defined to fit.")
+        sol = _least_squares(V[defined], I[defined], L, R, p, bounds)
+        p, fitted = sol.x, defined
+        nfev += sol.nfev
+
+    model = LangmuirModel(p[0], np.exp(p[1]), L, R, p[2])
+    with np.errstate(over="ignore", invalid="ignore"):
+        residuals = model.total_current(V) - I
+    residuals = residuals[np.isfinite(residuals)]
+    return {"p": p, "rmse": float(np.sqrt(np.mean(residuals**2))), "success": bool(sol.success), "nfev": nfev}
+
+
+def fit_sweep(measured_data, L, R, v_range=None, guess=None):
+    """
+    Fit T_ev, n_e and V_f of the Langmuir model to measured (voltage, current) pairs.
+
+    :measured_data: (N, 2) array of voltage/current pairs, e.g. from MainWindow
+    :L: probe length (mm)
+    :R: probe radius (mm)
+    :v_range: optional (v1, v2) bias window to restrict the fit to
+    :guess: optional (T_ev, n_e, V_f) starting point; if omitted the fit is run from
+            every start of starting_points() and the result with the lowest RMSE is kept
+    Returns a dict with the fitted parameters, V_P, the RMSE over the points where the
+    fitted model is defined and timing information.
+    """
+    start = time.perf_counter()
+    V, I = _as_columns(measured_data)
+    if v_range is not None:
+        in_range = (V >= min(v_range)) & (V <= max(v_range))
+        V, I = V[in_range], I[in_range]
+    if len(V) < 4:
+        raise ValueError("Need at least 4 data points to fit.")
+
+    starts = [guess] if guess is not None else starting_points(np.column_stack((V, I)), L, R)
+    lower = [T_EV_BOUNDS[0], np.log(N_E_BOUNDS[0]), V[0] - (V[-1] - V[0])]
+    upper = [T_EV_BOUNDS[1], np.log(N_E_BOUNDS[1]), V[-1] + (V[-1] - V[0])]
+    best, nfev, error = None, 0, None
+    for T_ev0, n_e0, V_f0 in starts:
+        p0 = np.clip([T_ev0, np.log(n_e0), V_f0], lower, upper)
+        try:
+            result = _fit_from(V, I, L, R, p0, (lower, upper))
+        except ValueError as failure:
+            error = failure
+            continue
+        nfev += result["nfev"]
+        if best is None or result["rmse"] < best["rmse"]:
+            best = result
+    if best is None:
+        raise error
+
+    T_ev, n_e, V_f = best["p"][0], np.exp(best["p"][1]), best["p"][2]
+    model = LangmuirModel(T_ev, n_e, L, R, V_f)
+    return {
+        "T_ev": float(T_ev),
+        "n_e": float(n_e),
+        "V_f": float(V_f),
+        "V_P": float(model.V_P),
+        "Xi": float(model.Xi),
+        "rmse": best["rmse"],
+        "success": best["success"],
+        "nfev": int(nfev),
+        "fit_time": time.perf_counter() - start,
+    }
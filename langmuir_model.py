@@ -0,0 +1,150 @@
+import numpy as np
+import scipy.special as special
+from sheath_table import outer_integral_lookup
+
+###########################################################################################
+
+# Vectorized Langmuir probe model (cylindrical probe, OML / planar electron collection).
+#
+# Same physics as the analysis window, but every function takes whole bias arrays.
+# Plasma parameters may also be arrays: they broadcast against the bias array, so
+# T_ev of shape (P, 1) with VB of shape (N,) evaluates P parameter sets at once -> (P, N).
+
+###########################################################################################
+
+m_i = 6.7e-26
+#AN=18 #atomic number
+e = 1.60217663 * 10**-19
+m_e = 9.1093837e-31
+eps_0 = 8.854 * 10**-12
+
+T_iv = .1             # ion temperature (eV)
+XI_PLANAR = 21.316    # probe radius / Debye length above which the planar sheath model is used
+
+
+def gamma(Xi, a, lambd, r):
+    return (-a * (lambd**r) / special.gamma(r)) * (Xi**(r-1)) * np.exp(-lambd * Xi)
+
+
+def electron_param(x, Xi):
+    base = (2 / np.sqrt(np.pi)) * np.sqrt(x) + special.erfcx(np.sqrt(x))
+    return (((base-1) * np.exp(Xi * gamma(Xi, 4.17, .05307, 1.168) * x**gamma(Xi, -0.8655, .1507, 2.3)))+1)
+
+
+def planar_electron(VB, Xi):
+    return (1 + (outer_integral_lookup(VB)/Xi))
+
+
+def sheath_coefficients(Xi):
+    """
+    Return the A, B, C, D ion-collection fit coefficients for a given Xi.
+    """
+    A = 1.12+(1/((1/(.00034*Xi**6.87))-(1/(.145*np.log(Xi/110)))))
+    B = .5+.008*Xi**1.5/np.exp(.18*Xi**.80)
+    C = 1.07+.95/Xi**1.01
+    D = .05+1.54*Xi**.3/np.exp(1.135*Xi**.370)
+    return A, B, C, D
+
+
+# Helpers for measured (voltage, current) data, shared by langmuir_fit and curve_library.
+
+def _as_columns(measured_data):
+    data = np.asarray(measured_data, dtype=float)
+    V, I = data[:, 0], data[:, 1]
+    order = np.argsort(V)
+    V, I = V[order], I[order]
+    keep = np.isfinite(V) & np.isfinite(I)
+    return V[keep], I[keep]
+
+
+def zero_crossing(V, I):
+    """
+    Floating potential estimate: last negative -> positive crossing of the current,
+    linearly interpolated (noise around a small ion current can cross zero well
+    below V_f; above V_f the electron current only grows). Falls back to the
+    point of smallest |I|.
+    """
+    crossings = np.nonzero((I[:-1] < 0) & (I[1:] >= 0))[0]
+    if len(crossings) == 0:
+        return V[np.argmin(np.abs(I))]
+    k = crossings[-1]
+    return V[k] - I[k] * (V[k+1] - V[k]) / (I[k+1] - I[k])
+
+
+class LangmuirModel:
+    """
+    Probe model for one (or a broadcastable batch of) parameter set(s).
+    All derived quantities (area, Debye length, Xi, V_P, saturation currents and
+    the A/B/C/D sheath coefficients) are computed once here.
+
+    :T_ev: electron temperature (eV)
+    :n_e: electron density (m^-3)
+    :L: probe length (mm)
+    :R: probe radius (mm), the value entered as "Probe Diameter" in the analysis window
+    :V_f: floating potential (V)
+    """
+    def __init__(self, T_ev, n_e, L, R, V_f):
+        self.T_ev = np.asarray(T_ev, dtype=float)
+        self.n_e = np.asarray(n_e, dtype=float)
+        self.L = np.asarray(L, dtype=float)
+        self.R = np.asarray(R, dtype=float)
+        self.V_f = np.asarray(V_f, dtype=float)
+
+        self.S = 2*np.pi*self.R*self.L*1e-6 # probe area im m^2 (NOT mm)
+        self.Debye = np.sqrt((eps_0*self.T_ev)/(self.n_e*e))
+        self.Xi = (self.R*.001)/self.Debye #R in m
+        self.V_P = self.V_f - (self.T_ev * np.log(.6*np.sqrt(2*np.pi*(m_e/m_i))))
+
+        n_i = self.n_e
+        self.I_is = .6 * e * n_i * np.sqrt(self.T_ev*e/m_i) * self.S
+        self.I_es = e * self.n_e * self.S * np.sqrt((self.T_ev*e)/(2*np.pi*m_e)) #chen
+
+        self.A, self.B, self.C, self.D = sheath_coefficients(self.Xi)
+
+    def ion_current(self, VB):
+        """
+        Ion current for an array of bias voltages (zero at and above V_f).
+        """
+        VB = np.asarray(VB, dtype=float)
+        below = VB < self.V_f
+        # Evaluate only where the ion term is defined; elsewhere use a harmless dummy.
+        x = np.where(below, (self.V_f-VB)/T_iv, 1.0)
+        I = -(1 / ((1 / (self.A * x**self.B)**4 + 1 / (self.C * x**self.D)**4)**(1/4))) * self.I_is
+        return np.where(below, I, 0.0)
+
+    def electron_current(self, VB):
+        """
+        Electron current for an array of bias voltages.
+        """
+        VB = np.asarray(VB, dtype=float)
+        retarding = VB < self.V_P
+        I_retarding = self.I_es * np.exp(-(self.V_P - VB) / self.T_ev)
+
+        # Saturation branch: OML-like fit for small Xi, planar sheath table for large Xi.
+        x = np.where(retarding, 0.0, VB - self.V_P)
+        with np.errstate(invalid="ignore"):
+            I_param = self.I_es * electron_param(x, self.Xi)
+            I_planar = self.I_es * planar_electron(-x, self.Xi)
+        I_saturation = np.where(self.Xi >= XI_PLANAR, I_planar, I_param)
+
+        return np.where(retarding, I_retarding, I_saturation)
+
+    def currents(self, VB):
+        """
+        Return (electron current, ion current) for an array of bias voltages.
+        """
+        return self.electron_current(VB), self.ion_current(VB)
+
+    def total_current(self, VB):
+        """
+        Net probe current (electron + ion) for an array of bias voltages.
+        """
+        I_e, I_i = self.currents(VB)
+        return I_e + I_i
+
+
+def ideal_current(VB, T_ev, n_e, L, R, V_f):
+    """
+    Convenience wrapper: net model current for bias array VB.
+    """
+    return LangmuirModel(T_ev, n_e, L, R, V_f).total_current(VB)
@@ -1,522 +1,1009 @@
-import sys
-import os
-import time
-import pyvisa
-import pandas as pd
-import numpy as np
-from PyQt5 import QtCore, QtWidgets, QtGui
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT
-from matplotlib.figure import Figure
-from threading import Thread
-import numpy as np
-from multiprocessing import Process
-
-
-# from analysis_window import launch_plot_from_data
-
-# from analysis_window_pyqt_v2 import launch_plot_from_data
-
-# =============================================================================
-# SweepWorker: Performs an adaptive IV sweep on the instrument.
-# =============================================================================
-class SweepWorker(QtCore.QObject):
-    # Signals emitted during the sweep:
-    # new_data: emits a tuple (voltage, current) each time new measurement is obtained.
-    # finished: emitted when the sweep is complete.
-    # error: emitted when an error occurs, with an error message.
-    new_data = QtCore.pyqtSignal(float, float)
-    finished = QtCore.pyqtSignal()
-    error = QtCore.pyqtSignal(str)
-    
-    def __init__(self, instrument, current_limit, min_voltage, max_voltage, sensitivity):
-        """
-        Initialize the SweepWorker with instrument parameters.
-        """
-        super().__init__()
-        self.instrument = instrument
-        self.current_limit = current_limit
-        self.min_voltage = min_voltage
-        self.max_voltage = max_voltage
-        self.sensitivity = sensitivity
-        self._paused = False
-        self._running = True
-
-    @QtCore.pyqtSlot()
-    def run(self):
-        """
-        This slot performs the IV sweep. It configures the instrument, 
-        then steps through voltage values using an adaptive step-size.
-        """
-        try:
-            # Reset and configure the instrument
-            self.instrument.write("*RST")
-            time.sleep(0.25)
-            self.instrument.write("SOURce:FUNCtion:MODE VOLTage")
-            time.sleep(0.1)
-            self.instrument.write(f"SOURce:VOLTage:CURRent:LIMit {self.current_limit}")
-            time.sleep(0.1)
-            self.instrument.write("SOURce:VOLTage:RANGe:CURRent:AUTO ON")
-            time.sleep(0.1)
-            self.instrument.write("SOURce:VOLTage:MEASure:PRIMary VOLTage")
-            time.sleep(0.1)
-            self.instrument.write("SOURce:VOLTage:MEASure:SECondary CURRent")
-            time.sleep(0.1)
-            self.instrument.write("OUTPut:STATe ON")
-            time.sleep(1)
-            
-            # Start the sweep using adaptive stepping.
-            voltage = self.min_voltage
-            base_step = 0.25  # Standard base step.
-            min_step = 0.025
-            max_step = base_step * 2
-            step = base_step
-            previous_current = None
-            
-            while self._running and voltage <= self.max_voltage:
-                # Check and honor the pause flag.
-                while self._paused and self._running:
-                    time.sleep(0.1)
-                if not self._running:
-                    break
-                
-                # Enable/disable HV state based on the voltage magnitude.
-                if abs(voltage) < 42.0:
-                    self.instrument.write("SYSTem:MODE:HV:STATe 0")
-                else:
-                    self.instrument.write("SYSTem:MODE:HV:STATe 1")
-                
-                # Set the voltage output on the instrument.
-                self.instrument.write(f"SOURce:VOLTage:FIXed {voltage}")
-                time.sleep(0.1)  # Allow time for voltage to settle
-                
-                # Query the instrument for current measurements.
-                meas_voltage = float(self.instrument.query("MEASure:PRIMary:LIVEdata?"))
-                meas_current = float(self.instrument.query("MEASure:SECondary:LIVEdata?"))
-                self.new_data.emit(meas_voltage, meas_current)
-                
-                # Calculate the adaptive step size based on the change in current.
-                if previous_current is not None:
-                    delta = abs(meas_current - previous_current)
-                    step = base_step * (self.sensitivity / (self.sensitivity + delta))
-                    step = max(min_step, min(step, max_step))
-                previous_current = meas_current
-                
-                voltage += step
-                if voltage > self.max_voltage:
-                    voltage = self.max_voltage
-                time.sleep(0.05)
-                
-            # Sweep completed; turn off output.
-            self.instrument.write("OUTPut:STATe OFF")
-            self.finished.emit()
-            
-        except Exception as e:
-            self.error.emit(str(e))
-            try:
-                self.instrument.write("OUTPut:STATe OFF")
-            except Exception:
-                pass
-            self.finished.emit()
-
-    def pause(self):
-        """Pause the sweep."""
-        self._paused = True
-
-    def resume(self):
-        """Resume the sweep."""
-        self._paused = False
-
-    def stop(self):
-        """Stop the sweep."""
-        self._running = False
-
-# =============================================================================
-# MplCanvas: Matplotlib canvas embedded in a PyQt widget.
-# =============================================================================
-class MplCanvas(FigureCanvas):
-    def __init__(self, parent=None):
-        """
-        Initialize the Matplotlib figure and axes.
-        """
-        fig = Figure(figsize=(5, 4), dpi=200, constrained_layout=True)
-        self.ax = fig.add_subplot(111)
-        self.ax.grid(True)
-        fig.set_constrained_layout_pads(w_pad=0.2, h_pad=0.2, wspace=0.2, hspace=0.3)
-        super().__init__(fig)
-
-# =============================================================================
-# MainWindow: The main GUI window containing all controls and the plot.
-# =============================================================================
-class MainWindow(QtWidgets.QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("IV Sweep Controller")
-        self.resize(1920, 1080)
-        
-        # Instrument and threading variables.
-        self.instrument = None
-        self.rm = None
-        self.worker = None
-        self.thread = None
-        
-        # -----------------------------
-        # Create main layout and widgets
-        # -----------------------------
-        central_widget = QtWidgets.QWidget()
-        self.setCentralWidget(central_widget)
-        main_layout = QtWidgets.QVBoxLayout(central_widget)
-        
-        # Create a grid layout for parameter input controls.
-        controls_layout = QtWidgets.QGridLayout()
-        # Create a horizontal layout for primary control buttons.
-        buttons_layout = QtWidgets.QHBoxLayout()
-        
-        # Create and configure QLineEdit widgets for user input.
-        self.current_limit_edit = QtWidgets.QLineEdit()
-        self.current_limit_edit.setPlaceholderText("Current Compliance (A)")
-        current_validator = QtGui.QDoubleValidator(0.0, 0.1, 2, self)
-        current_validator.setNotation(QtGui.QDoubleValidator.StandardNotation)
-        self.current_limit_edit.setValidator(current_validator)
-        
-        self.min_voltage_edit = QtWidgets.QLineEdit()
-        self.min_voltage_edit.setPlaceholderText("Min Voltage (V)")
-        min_voltage_validator = QtGui.QDoubleValidator(-200.0, 200.0, 2)
-        min_voltage_validator.setNotation(QtGui.QDoubleValidator.StandardNotation)
-        self.min_voltage_edit.setValidator(min_voltage_validator)
-        
-        self.max_voltage_edit = QtWidgets.QLineEdit()
-        self.max_voltage_edit.setPlaceholderText("Max Voltage (V)")
-        max_voltage_validator = QtGui.QDoubleValidator(-200.0, 200.0, 2)
-        max_voltage_validator.setNotation(QtGui.QDoubleValidator.StandardNotation)
-        self.max_voltage_edit.setValidator(max_voltage_validator)
-        
-        self.sensitivity_spin = QtWidgets.QDoubleSpinBox()
-        self.sensitivity_spin.setDecimals(1)
-        self.sensitivity_spin.setSuffix(" µA")
-        self.sensitivity_spin.setRange(0.1, 25.0)
-        self.sensitivity_spin.setSingleStep(0.1)
-        self.sensitivity_spin.setValue(5.0)
-
-        # self.sensitivity_edit = QtWidgets.QLineEdit()
-        # self.sensitivity_edit.setPlaceholderText("Adaptive Sensitivity")
-        # self.sensitivity_edit.setValidator(QtGui.QRegExpValidator(QtCore.QRegExp(r"^\d+(\.\d+)?$")))
-        
-        # Add the input widgets and their labels to the grid layout.
-        controls_layout.addWidget(QtWidgets.QLabel("Current Compliance (A):"), 0, 0)
-        controls_layout.addWidget(self.current_limit_edit, 0, 1)
-        controls_layout.addWidget(QtWidgets.QLabel("Min Voltage (V):"), 1, 0)
-        controls_layout.addWidget(self.min_voltage_edit, 1, 1)
-        controls_layout.addWidget(QtWidgets.QLabel("Max Voltage (V):"), 2, 0)
-        controls_layout.addWidget(self.max_voltage_edit, 2, 1)
-        controls_layout.addWidget(QtWidgets.QLabel("Adaptive Sensitivity:"), 3, 0)
-        controls_layout.addWidget(self.sensitivity_spin, 3, 1)
-        
-        # Create primary control buttons.
-        self.connect_button = QtWidgets.QPushButton("Connect/Initialize")
-        self.start_button = QtWidgets.QPushButton("Start")
-        self.pause_button = QtWidgets.QPushButton("Pause")
-        self.stop_button = QtWidgets.QPushButton("Stop")
-        self.toggle_scale_button = QtWidgets.QPushButton("Toggle Scale (Linear/Log)")
-        
-        # Add the buttons to the horizontal layout.
-        buttons_layout.addWidget(self.connect_button)
-        buttons_layout.addWidget(self.start_button)
-        buttons_layout.addWidget(self.pause_button)
-        buttons_layout.addWidget(self.stop_button)
-        buttons_layout.addWidget(self.toggle_scale_button)
-        
-        # Create a status indicator (a small colored frame) to show the probe state.
-        self.status_indicator = QtWidgets.QFrame()
-        self.status_indicator.setFixedSize(20, 20)
-        self.set_status("offline")
-        status_layout = QtWidgets.QHBoxLayout()
-        status_layout.addWidget(QtWidgets.QLabel("Probe Status:"))
-        status_layout.addWidget(self.status_indicator)
-        status_layout.addStretch()
-        
-        # Create additional buttons for saving and loading data.
-        self.save_data_button = QtWidgets.QPushButton("Save Data to CSV")
-        self.save_plot_button = QtWidgets.QPushButton("Save Plot to PNG")
-        self.upload_csv_button = QtWidgets.QPushButton("Upload CSV")
-        extra_buttons_layout = QtWidgets.QHBoxLayout()
-        extra_buttons_layout.addWidget(self.save_data_button)
-        extra_buttons_layout.addWidget(self.save_plot_button)
-        extra_buttons_layout.addWidget(self.upload_csv_button)
-        
-        # Add the analysis window button.
-        self.analysis_window = None
-        self.open_analysis_button = QtWidgets.QPushButton("Open Analysis Window")
-        extra_buttons_layout.addWidget(self.open_analysis_button)
-        self.open_analysis_button.clicked.connect(self.open_analysis_window)
-        
-        # Add the control layouts to the main layout.
-        main_layout.addLayout(controls_layout)
-        main_layout.addLayout(buttons_layout)
-        main_layout.addLayout(status_layout)
-        main_layout.addLayout(extra_buttons_layout)
-        
-        # -----------------------------
-        # Create the Matplotlib canvas and toolbar.
-        # -----------------------------
-        self.canvas = MplCanvas(self)
-        self.toolbar = NavigationToolbar2QT(self.canvas, self)
-        main_layout.addWidget(self.canvas)
-        main_layout.addWidget(self.toolbar)
-        
-        # Set up the initial plot labels and title.
-        self.canvas.ax.set_xlabel("Voltage (V)")
-        self.canvas.ax.set_ylabel("Current (A)")
-        self.canvas.ax.set_title("IV Curve")
-        # Initialize an empty line plot.
-        self.line, = self.canvas.ax.plot([], [], 'b-o')
-        # Lists to store sweep data.
-        self.voltages = []
-        self.currents = []
-        
-        # -----------------------------
-        # Connect button signals to their corresponding slots.
-        # -----------------------------
-        self.connect_button.clicked.connect(self.connect_instrument)
-        self.start_button.clicked.connect(self.start_sweep)
-        self.pause_button.clicked.connect(self.pause_resume)
-        self.stop_button.clicked.connect(self.stop_sweep)
-        self.toggle_scale_button.clicked.connect(self.toggle_scale)
-        self.save_data_button.clicked.connect(self.save_data_to_csv)
-        self.save_plot_button.clicked.connect(self.save_plot_to_png)
-        self.upload_csv_button.clicked.connect(self.upload_csv)
-        
-        # Track sweep status.
-        self.sweep_running = False
-        self.sweep_paused = False
-
-    def set_status(self, state):
-        """
-        Set the probe status indicator color.
-        """
-        colors = {"ready": "green", "running": "red", "paused": "yellow", "offline": "grey"}
-        color = colors.get(state, "grey")
-        self.status_indicator.setStyleSheet(f"background-color: {color}; border: 1px solid black;")
-        
-    def connect_instrument(self):
-        """
-        Attempt to connect to the instrument via pyvisa.
-        """
-        try:
-            self.rm = pyvisa.ResourceManager()
-            # Update the VISA address as needed.
-            self.instrument = self.rm.open_resource('ASRL3::INSTR')
-            self.instrument.timeout = 10000
-            self.instrument.write_termination = '\n'
-            self.instrument.read_termination = '\n'
-            self.set_status("ready")
-            QtWidgets.QMessageBox.information(self, "Success", "Instrument connected and initialized.")
-        except Exception as e:
-            self.set_status("offline")
-            QtWidgets.QMessageBox.critical(self, "Connection Error", f"Failed to connect: {str(e)}")
-        
-    def start_sweep(self):
-        """
-        Read the user parameters, reset any previous data, and start the IV sweep
-        in a new thread using SweepWorker.
-        """
-        if not self.instrument:
-            QtWidgets.QMessageBox.warning(self, "Error", "Instrument not connected!")
-            return
-        
-        try:
-            current_limit = float(self.current_limit_edit.text())
-            min_voltage = float(self.min_voltage_edit.text())
-            max_voltage = float(self.max_voltage_edit.text())
-            sensitivity = self.sensitivity_spin.value() * 1e-6
-        except ValueError:
-            QtWidgets.QMessageBox.warning(self, "Input Error", "Please enter valid numeric parameters.")
-            return
-        
-        if min_voltage >= max_voltage:
-            QtWidgets.QMessageBox.warning(self, "Input Error", "Min Voltage must be less than Max Voltage.")
-            return
-        
-        # Clear previous data and reset the plot.
-        self.voltages = []
-        self.currents = []
-        self.line.set_data(self.voltages, self.currents)
-        self.canvas.ax.relim()
-        self.canvas.ax.autoscale_view()
-        self.canvas.draw()
-        
-        # Create and start the sweep thread.
-        self.thread = QtCore.QThread()
-        self.worker = SweepWorker(self.instrument, current_limit, min_voltage, max_voltage, sensitivity)
-        self.worker.moveToThread(self.thread)
-        self.worker.new_data.connect(self.update_plot)
-        self.worker.finished.connect(self.sweep_finished)
-        self.worker.error.connect(self.handle_error)
-        self.thread.started.connect(self.worker.run)
-        
-        self.thread.start()
-        self.sweep_running = True
-        self.sweep_paused = False
-        self.pause_button.setText("Pause")
-        self.set_status("running")
-        
-    def refresh_plot(self):
-        """
-        Update the plot line data.
-        """
-        plot_currents = np.abs(self.currents) if self.canvas.ax.get_yscale() == "log" else self.currents
-        self.line.set_data(self.voltages, plot_currents)
-        self.canvas.ax.relim()
-        self.canvas.ax.autoscale_view()
-        self.canvas.draw()
-
-    def update_plot(self, voltage, current):
-        """
-        Append new voltage/current data and update the plot.
-        """
-        self.voltages.append(voltage)
-        self.currents.append(current)
-        self.refresh_plot()
-        if self.analysis_window is not None:
-            self.analysis_window.voltages = self.voltages
-            self.analysis_window.currents = self.currents
-
-    def pause_resume(self):
-        """
-        Toggle the pause/resume state of the sweep.
-        """
-        if not self.worker:
-            return
-        if self.sweep_paused:
-            self.worker.resume()
-            self.sweep_paused = False
-            self.pause_button.setText("Pause")
-            self.set_status("running")
-        else:
-            self.worker.pause()
-            self.sweep_paused = True
-            self.pause_button.setText("Resume")
-            self.set_status("paused")
-        
-    def stop_sweep(self):
-        """
-        Stop the sweep and safely disconnect the instrument.
-        """
-        if self.worker:
-            self.worker.stop()
-        if self.thread:
-            self.thread.quit()
-            self.thread.wait()
-        if self.instrument:
-            try:
-                self.instrument.write("*RST")
-                self.instrument.write("OUTPut:STATe OFF")
-                self.instrument.close()
-            except Exception as e:
-                print(f"Error during disconnect: {e}")
-            self.instrument = None
-        self.set_status("offline")
-        QtWidgets.QMessageBox.information(self, "Sweep Cancelled", "Sweep cancelled.")
-        self.sweep_running = False
-        
-    def sweep_finished(self):
-        """
-        Called when the sweep finishes normally.
-        """
-        self.thread.quit()
-        self.thread.wait()
-        self.set_status("ready")
-        QtWidgets.QMessageBox.information(self, "Sweep Completed", "Sweep finished successfully.")
-        
-    def handle_error(self, error_msg):
-        """
-        Display an error message and stop the sweep.
-        """
-        QtWidgets.QMessageBox.critical(self, "Sweep Error", error_msg)
-        self.stop_sweep()
-        
-    def toggle_scale(self):
-        """
-        Toggle the y-axis scale between linear and logarithmic.
-        """
-        if not self.voltages or not self.currents:
-            QtWidgets.QMessageBox.warning(self, "No Data", "No data available to toggle scale.")
-            return
-        current_scale = self.canvas.ax.get_yscale()
-        self.canvas.ax.set_yscale("log" if current_scale == "linear" else "linear")
-        self.refresh_plot()
-
-    def save_data_to_csv(self):
-        """
-        Save the current voltage/current data to a CSV file.
-        """
-        if not self.voltages or not self.currents:
-            QtWidgets.QMessageBox.warning(self, "No Data", "No data available to save.")
-            return
-        df = pd.DataFrame({"Voltage (V)": self.voltages, "Current (A)": self.currents})
-        filename, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save Data", "", "CSV Files (*.csv)")
-        if filename:
-            try:
-                df.to_csv(filename, index=False)
-                QtWidgets.QMessageBox.information(self, "Saved", f"Data saved to {filename}")
-            except Exception as e:
-                QtWidgets.QMessageBox.critical(self, "Save Error", str(e))
-                
-    def save_plot_to_png(self):
-        """
-        Save the current plot to a PNG image file.
-        """
-        if not self.voltages or not self.currents:
-            QtWidgets.QMessageBox.warning(self, "No Data", "No data available to save plot.")
-            return
-        filename, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save Plot", "", "PNG Files (*.png)")
-        if filename:
-            try:
-                self.canvas.figure.savefig(filename)
-                QtWidgets.QMessageBox.information(self, "Saved", f"Plot saved to {filename}")
-            except Exception as e:
-                QtWidgets.QMessageBox.critical(self, "Save Error", str(e))
-                
-    def upload_csv(self):
-        """
-        Load voltage/current data from a CSV file and update the plot.
-        """
-        filename, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Open CSV", "", "CSV Files (*.csv)")
-        if filename:
-            try:
-                df = pd.read_csv(filename)
-                if "Voltage (V)" in df.columns and "Current (A)" in df.columns:
-                    self.voltages = df["Voltage (V)"].tolist()
-                    self.currents = df["Current (A)"].tolist()
-                    self.line.set_data(self.voltages, self.currents)
-                    self.canvas.ax.relim()
-                    self.canvas.ax.autoscale_view()
-                    self.canvas.draw()
-                    QtWidgets.QMessageBox.information(self, "File Loaded", "CSV data loaded successfully.")
-                else:
-                    QtWidgets.QMessageBox.warning(self, "File Error", "CSV does not contain required columns 'Voltage (V)' and 'Current (A)'.")
-            except Exception as e:
-                QtWidgets.QMessageBox.critical(self, "File Error", str(e))
-
-    def open_analysis_window(self):
-        if not self.voltages or not self.currents:
-            QtWidgets.QMessageBox.warning(
-                self, "No Data",
-                "No data available for analysis. Please run a sweep or upload CSV data first."
-            )
-            return
-        # import the new launcher from refactored GUI module
-        from GUIFinalRefactored import launch_GUIFinal
-        measured_data = np.column_stack((self.voltages, self.currents))
-        proc  = Process(target=launch_GUIFinal, args=(measured_data,), daemon=True)
-        proc.start()
-
-def main():
-    app = QtWidgets.QApplication(sys.argv)
-    window = MainWindow()
-    window.show()
-    sys.exit(app.exec_())
-
-if __name__ == '__main__':
-    main()
-    
+import sys
+import os
+import time
+import pandas as pd
+import numpy as np
+from PyQt5 import QtCore, QtWidgets, QtGui
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT
+from matplotlib.figure import Figure
+from threading import Thread
+import numpy as np
+from step_planners import PLANNERS, POINT_BUDGET
+from sample_buffer import SampleBuffer, SAMPLE_FIELDS, CSV_HEADERS
+from acquisition_log import LOG_EXTENSION, log_to_dataframe, read_log_metadata
+from run_file import RunFile, RUN_EXTENSION, save_run
+from sweep_engine import SweepEngine, LOG_DIR
+from sweep_session import SweepSession, SessionData
+from perf_counters import PerfCounters, write_trace
+from analysis_process import AnalysisProcess
+from online_estimator import OnlineEstimator
+
+PLOT_INTERVAL_MS = 40        # live plot frame period (~25 fps)
+MAX_PLOT_POINTS = 5000       # above this the live line is decimated for display
+PLOT_MARGIN = 0.1            # fraction of the data span added when the axes grow
+PERF_INTERVAL_MS = 500       # performance panel update period
+STREAM_RESYNC_POINTS = 10000 # backlog above which the analysis window gets a full copy
+DEFAULT_RESOURCE = "ASRL3::INSTR"
+PROBE_COLORS = ("tab:green", "tab:orange", "tab:purple", "tab:brown", "tab:pink", "tab:cyan")
+
+
+# from analysis_window import launch_plot_from_data
+
+# from analysis_window_pyqt_v2 import launch_plot_from_data
+
+# =============================================================================
+# SweepWorker: Runs a SweepEngine on a QThread and relays it as Qt signals.
+# =============================================================================
+class SweepWorker(QtCore.QObject):
+    # Signals emitted during the sweep:
+    # new_data: emits a tuple (timestamp, set_voltage, voltage, current, settle_time, io_latency)
+    #           each time new measurement is obtained (see sample_buffer.SAMPLE_FIELDS).
+    # sweep_completed: emits a dict for every completed pass (index, direction,
+    #                  samples, running average) in repeated mode.
+    # finished: emitted when the sweep is complete.
+    # error: emitted when an error occurs, with an error message.
+    new_data = QtCore.pyqtSignal(tuple)
+    sweep_completed = QtCore.pyqtSignal(object)
+    finished = QtCore.pyqtSignal()
+    error = QtCore.pyqtSignal(str)
+    
+    def __init__(self, smu, *args, **kwargs):
+        """
+        Qt front end of a SweepEngine (see sweep_engine.py for the parameters):
+        the engine's callbacks are emitted as signals.
+        """
+        super().__init__()
+        self.engine = SweepEngine(smu, *args, **kwargs, on_sample=self.emit_sample,
+                                  on_pass=self.sweep_completed.emit, on_finished=self.finished.emit,
+                                  on_error=self.error.emit)
+        self.perf = self.engine.perf
+
+    @property
+    def emitted(self):
+        return self.engine.emitted
+
+    @property
+    def log_path(self):
+        return self.engine.log_path
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        """
+        This slot performs the IV sweep on the worker's thread.
+        """
+        self.engine.run()
+
+    def emit_sample(self, sample):
+        self.new_data.emit(sample)
+
+    def parameters(self):
+        return self.engine.parameters()
+
+    def pause(self):
+        """Pause the sweep."""
+        self.engine.pause()
+
+    def resume(self):
+        """Resume the sweep."""
+        self.engine.resume()
+
+    def stop(self):
+        """Stop the sweep."""
+        self.engine.stop()
+
+# =============================================================================
+# MplCanvas: Matplotlib canvas embedded in a PyQt widget.
+# =============================================================================
+class MplCanvas(FigureCanvas):
+    def __init__(self, parent=None):
+        """
+        Initialize the Matplotlib figure and axes.
+        """
+        fig = Figure(figsize=(5, 4), dpi=200, constrained_layout=True)
+        self.ax = fig.add_subplot(111)
+        self.ax.grid(True)
+        fig.set_constrained_layout_pads(w_pad=0.2, h_pad=0.2, wspace=0.2, hspace=0.3)
+        super().__init__(fig)
+
+# =============================================================================
+# MainWindow: The main GUI window containing all controls and the plot.
+# =============================================================================
+class MainWindow(QtWidgets.QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("IV Sweep Controller")
+        self.resize(1920, 1080)
+        
+        # Instruments, one SweepWorker thread per instrument.
+        self.session = SweepSession()
+        
+        # -----------------------------
+        # Create main layout and widgets
+        # -----------------------------
+        central_widget = QtWidgets.QWidget()
+        self.setCentralWidget(central_widget)
+        main_layout = QtWidgets.QVBoxLayout(central_widget)
+        
+        # Create a grid layout for parameter input controls.
+        controls_layout = QtWidgets.QGridLayout()
+        # Create a horizontal layout for primary control buttons.
+        buttons_layout = QtWidgets.QHBoxLayout()
+        
+        # Create and configure QLineEdit widgets for user input.
+        self.current_limit_edit = QtWidgets.QLineEdit()
+        self.current_limit_edit.setPlaceholderText("Current Compliance (A)")
+        current_validator = QtGui.QDoubleValidator(0.0, 0.1, 2, self)
+        current_validator.setNotation(QtGui.QDoubleValidator.StandardNotation)
+        self.current_limit_edit.setValidator(current_validator)
+        
+        self.min_voltage_edit = QtWidgets.QLineEdit()
+        self.min_voltage_edit.setPlaceholderText("Min Voltage (V)")
+        min_voltage_validator = QtGui.QDoubleValidator(-200.0, 200.0, 2)
+        min_voltage_validator.setNotation(QtGui.QDoubleValidator.StandardNotation)
+        self.min_voltage_edit.setValidator(min_voltage_validator)
+        
+        self.max_voltage_edit = QtWidgets.QLineEdit()
+        self.max_voltage_edit.setPlaceholderText("Max Voltage (V)")
+        max_voltage_validator = QtGui.QDoubleValidator(-200.0, 200.0, 2)
+        max_voltage_validator.setNotation(QtGui.QDoubleValidator.StandardNotation)
+        self.max_voltage_edit.setValidator(max_voltage_validator)
+        
+        self.sensitivity_spin = QtWidgets.QDoubleSpinBox()
+        self.sensitivity_spin.setDecimals(1)
+        self.sensitivity_spin.setSuffix(" µA")
+        self.sensitivity_spin.setRange(0.1, 25.0)
+        self.sensitivity_spin.setSingleStep(0.1)
+        self.sensitivity_spin.setValue(5.0)
+
+        # Sweep mode: adaptive point-by-point, hardware-timed list sweep, or a
+        # coarse list scan refined around the floating potential and the knee.
+        self.mode_combo = QtWidgets.QComboBox()
+        self.mode_combo.addItem("Adaptive (point by point)", "adaptive")
+        self.mode_combo.addItem("Hardware List (fixed step)", "list")
+        self.mode_combo.addItem("Coarse + Refine (list)", "refine")
+
+        self.list_step_spin = QtWidgets.QDoubleSpinBox()
+        self.list_step_spin.setDecimals(3)
+        self.list_step_spin.setSuffix(" V")
+        self.list_step_spin.setRange(0.005, 10.0)
+        self.list_step_spin.setSingleStep(0.05)
+        self.list_step_spin.setValue(0.25)
+
+        self.dwell_spin = QtWidgets.QDoubleSpinBox()
+        self.dwell_spin.setDecimals(3)
+        self.dwell_spin.setSuffix(" s")
+        self.dwell_spin.setRange(0.001, 10.0)
+        self.dwell_spin.setSingleStep(0.01)
+        self.dwell_spin.setValue(0.1)
+
+        self.settle_spin = QtWidgets.QDoubleSpinBox()
+        self.settle_spin.setDecimals(2)
+        self.settle_spin.setSuffix(" %")
+        self.settle_spin.setRange(0.01, 50.0)
+        self.settle_spin.setSingleStep(0.1)
+        self.settle_spin.setValue(1.0)
+
+        # Repeated sweeps: number of passes (0 = continuous) and up/down passes.
+        self.repeat_spin = QtWidgets.QSpinBox()
+        self.repeat_spin.setRange(0, 1000000)
+        self.repeat_spin.setSpecialValueText("Continuous")
+        self.repeat_spin.setValue(1)
+        self.bidirectional_check = QtWidgets.QCheckBox("Bidirectional (up/down passes)")
+
+        # Step planner for adaptive mode.
+        self.planner_combo = QtWidgets.QComboBox()
+        for name, label in PLANNERS.items():
+            self.planner_combo.addItem(label, name)
+
+        # Points per pass in coarse + refine mode.
+        self.point_budget_spin = QtWidgets.QSpinBox()
+        self.point_budget_spin.setRange(10, 100000)
+        self.point_budget_spin.setValue(POINT_BUDGET)
+
+        # End the sweep once the live T_e/V_f estimates have converged.
+        self.stop_converged_check = QtWidgets.QCheckBox("Stop when Te/Vf converge")
+
+        # Probe geometry (optional) is stored with saved run files.
+        self.probe_length_edit = QtWidgets.QLineEdit()
+        self.probe_length_edit.setPlaceholderText("Probe Length (mm)")
+        self.probe_length_edit.setValidator(QtGui.QDoubleValidator(0.0, 1000.0, 3))
+        self.probe_radius_edit = QtWidgets.QLineEdit()
+        self.probe_radius_edit.setPlaceholderText("Probe Radius (mm)")
+        self.probe_radius_edit.setValidator(QtGui.QDoubleValidator(0.0, 1000.0, 3))
+
+        # VISA resources to open (comma separated; empty = all discovered instruments).
+        self.resources_edit = QtWidgets.QLineEdit(DEFAULT_RESOURCE)
+        self.resources_edit.setPlaceholderText("All discovered instruments")
+        self.discover_button = QtWidgets.QPushButton("Discover")
+        self.synchronized_check = QtWidgets.QCheckBox("Synchronized start")
+        self.synchronized_check.setChecked(True)
+
+        # self.sensitivity_edit = QtWidgets.QLineEdit()
+        # self.sensitivity_edit.setPlaceholderText("Adaptive Sensitivity")
+        # self.sensitivity_edit.setValidator(QtGui.QRegExpValidator(QtCore.QRegExp(r"^\d+(\.\d+)?$")))
+        
+        # Add the input widgets and their labels to the grid layout.
+        controls_layout.addWidget(QtWidgets.QLabel("Current Compliance (A):"), 0, 0)
+        controls_layout.addWidget(self.current_limit_edit, 0, 1)
+        controls_layout.addWidget(QtWidgets.QLabel("Min Voltage (V):"), 1, 0)
+        controls_layout.addWidget(self.min_voltage_edit, 1, 1)
+        controls_layout.addWidget(QtWidgets.QLabel("Max Voltage (V):"), 2, 0)
+        controls_layout.addWidget(self.max_voltage_edit, 2, 1)
+        controls_layout.addWidget(QtWidgets.QLabel("Adaptive Sensitivity:"), 3, 0)
+        controls_layout.addWidget(self.sensitivity_spin, 3, 1)
+        controls_layout.addWidget(QtWidgets.QLabel("Sweep Mode:"), 4, 0)
+        controls_layout.addWidget(self.mode_combo, 4, 1)
+        controls_layout.addWidget(QtWidgets.QLabel("List Step:"), 5, 0)
+        controls_layout.addWidget(self.list_step_spin, 5, 1)
+        controls_layout.addWidget(QtWidgets.QLabel("List Dwell:"), 6, 0)
+        controls_layout.addWidget(self.dwell_spin, 6, 1)
+        controls_layout.addWidget(QtWidgets.QLabel("Settle Tolerance:"), 7, 0)
+        controls_layout.addWidget(self.settle_spin, 7, 1)
+        controls_layout.addWidget(QtWidgets.QLabel("Probe Length (mm):"), 8, 0)
+        controls_layout.addWidget(self.probe_length_edit, 8, 1)
+        controls_layout.addWidget(QtWidgets.QLabel("Probe Radius (mm):"), 9, 0)
+        controls_layout.addWidget(self.probe_radius_edit, 9, 1)
+        controls_layout.addWidget(QtWidgets.QLabel("Repeat Sweeps:"), 0, 2)
+        controls_layout.addWidget(self.repeat_spin, 0, 3)
+        controls_layout.addWidget(self.bidirectional_check, 1, 3)
+        controls_layout.addWidget(QtWidgets.QLabel("VISA Resources:"), 2, 2)
+        controls_layout.addWidget(self.resources_edit, 2, 3)
+        controls_layout.addWidget(self.discover_button, 3, 2)
+        controls_layout.addWidget(self.synchronized_check, 3, 3)
+        controls_layout.addWidget(QtWidgets.QLabel("Step Planner:"), 4, 2)
+        controls_layout.addWidget(self.planner_combo, 4, 3)
+        controls_layout.addWidget(QtWidgets.QLabel("Point Budget:"), 5, 2)
+        controls_layout.addWidget(self.point_budget_spin, 5, 3)
+        controls_layout.addWidget(self.stop_converged_check, 6, 3)
+        
+        # Create primary control buttons.
+        self.connect_button = QtWidgets.QPushButton("Connect/Initialize")
+        self.start_button = QtWidgets.QPushButton("Start")
+        self.pause_button = QtWidgets.QPushButton("Pause")
+        self.stop_button = QtWidgets.QPushButton("Stop")
+        self.toggle_scale_button = QtWidgets.QPushButton("Toggle Scale (Linear/Log)")
+        
+        # Add the buttons to the horizontal layout.
+        buttons_layout.addWidget(self.connect_button)
+        buttons_layout.addWidget(self.start_button)
+        buttons_layout.addWidget(self.pause_button)
+        buttons_layout.addWidget(self.stop_button)
+        buttons_layout.addWidget(self.toggle_scale_button)
+        
+        # Create a status indicator (a small colored frame) to show the probe state.
+        self.status_indicator = QtWidgets.QFrame()
+        self.status_indicator.setFixedSize(20, 20)
+        self.set_status("offline")
+        status_layout = QtWidgets.QHBoxLayout()
+        status_layout.addWidget(QtWidgets.QLabel("Probe Status:"))
+        status_layout.addWidget(self.status_indicator)
+        self.latency_label = QtWidgets.QLabel("I/O: -- ms  Settle: -- ms")
+        status_layout.addWidget(self.latency_label)
+        self.sweep_count_label = QtWidgets.QLabel("")
+        status_layout.addWidget(self.sweep_count_label)
+        self.perf_label = QtWidgets.QLabel("-- pts/s")
+        self.perf_label.setToolTip("Acquisition rate, mean instrument I/O time, samples waiting for the GUI, "
+                                   "mean plot draw time and dropped plot frames.")
+        status_layout.addWidget(self.perf_label)
+        self.estimate_label = QtWidgets.QLabel("Te -- eV  Vf -- V")
+        self.estimate_label.setToolTip("Live electron temperature and floating potential of the pass in progress "
+                                       "(first instrument), estimated from the samples as they arrive.")
+        status_layout.addWidget(self.estimate_label)
+        status_layout.addStretch()
+        
+        # Create additional buttons for saving and loading data.
+        self.save_data_button = QtWidgets.QPushButton("Save Data")
+        self.save_plot_button = QtWidgets.QPushButton("Save Plot to PNG")
+        self.upload_csv_button = QtWidgets.QPushButton("Upload CSV")
+        extra_buttons_layout = QtWidgets.QHBoxLayout()
+        extra_buttons_layout.addWidget(self.save_data_button)
+        extra_buttons_layout.addWidget(self.save_plot_button)
+        extra_buttons_layout.addWidget(self.upload_csv_button)
+        self.save_trace_button = QtWidgets.QPushButton("Save Perf Trace")
+        extra_buttons_layout.addWidget(self.save_trace_button)
+        
+        # Add the analysis window button.
+        # The analysis window lives in one long-lived process, started in the
+        # background once the main window is up. New samples of self.data are
+        # streamed to it once per plot frame.
+        self.analysis = AnalysisProcess()
+        self.streamed_data = None
+        self.streamed = 0
+        QtCore.QTimer.singleShot(0, self.analysis.start)
+        self.open_analysis_button = QtWidgets.QPushButton("Open Analysis Window")
+        extra_buttons_layout.addWidget(self.open_analysis_button)
+        self.open_analysis_button.clicked.connect(self.open_analysis_window)
+        
+        # Add the control layouts to the main layout.
+        main_layout.addLayout(controls_layout)
+        main_layout.addLayout(buttons_layout)
+        main_layout.addLayout(status_layout)
+        main_layout.addLayout(extra_buttons_layout)
+        
+        # -----------------------------
+        # Create the Matplotlib canvas and toolbar.
+        # -----------------------------
+        self.canvas = MplCanvas(self)
+        self.toolbar = NavigationToolbar2QT(self.canvas, self)
+        main_layout.addWidget(self.canvas)
+        main_layout.addWidget(self.toolbar)
+        
+        # Set up the initial plot labels and title.
+        self.canvas.ax.set_xlabel("Voltage (V)")
+        self.canvas.ax.set_ylabel("Current (A)")
+        self.canvas.ax.set_title("IV Curve")
+        # Initialize an empty line plot. The line is animated so that live
+        # updates only blit it over a cached background.
+        self.line, = self.canvas.ax.plot([], [], 'b-o', animated=True)
+        # Running average of repeated sweeps (mean line and +/- 1 std band).
+        self.average_line, = self.canvas.ax.plot([], [], 'r-', linewidth=2)
+        self.average_band = None
+        self.average = None
+        self.plot_background = None
+        self.canvas.mpl_connect("draw_event", self.on_canvas_draw)
+        # One array-backed buffer (and live line) per instrument or loaded file.
+        # self.data is the primary one: analysed, averaged and saved on its own.
+        self.session_data = SessionData()
+        self.data = SampleBuffer()
+        self.lines = {}
+        self.live_starts = {}
+        # Sweep parameters and probe geometry describing self.data.
+        self.run_metadata = {}
+        # First row of each pass in self.data; the live lines show only the current pass.
+        self.sweep_starts = [0]
+        # Live T_e/V_f of the current pass of self.data.
+        self.estimator = OnlineEstimator()
+        self.stopped_converged = False
+        self.reset_bounds()
+        self.sweep_xlim = None
+        self.limits_initialized = False
+        
+        # New points are coalesced and drawn at most once per timer tick.
+        self.plot_dirty = False
+        self.last_io_latency = 0.0
+        self.last_settle_time = 0.0
+        self.plot_timer = QtCore.QTimer(self)
+        self.plot_timer.setInterval(PLOT_INTERVAL_MS)
+        self.plot_timer.timeout.connect(self.render_pending)
+        self.plot_timer.start()
+        
+        # Always-on timing counters for the GUI thread, summarized in perf_label.
+        self.perf = PerfCounters("gui")
+        self.samples_received = 0
+        self.last_frame = None
+        self.perf_previous = None
+        self.perf_timer = QtCore.QTimer(self)
+        self.perf_timer.setInterval(PERF_INTERVAL_MS)
+        self.perf_timer.timeout.connect(self.update_perf_panel)
+        self.perf_timer.start()
+        
+        # -----------------------------
+        # Connect button signals to their corresponding slots.
+        # -----------------------------
+        self.connect_button.clicked.connect(self.connect_instrument)
+        self.discover_button.clicked.connect(self.discover_instruments)
+        self.start_button.clicked.connect(self.start_sweep)
+        self.pause_button.clicked.connect(self.pause_resume)
+        self.stop_button.clicked.connect(self.stop_sweep)
+        self.toggle_scale_button.clicked.connect(self.toggle_scale)
+        self.save_data_button.clicked.connect(self.save_data_to_csv)
+        self.save_plot_button.clicked.connect(self.save_plot_to_png)
+        self.upload_csv_button.clicked.connect(self.upload_csv)
+        self.save_trace_button.clicked.connect(self.save_trace)
+        self.session.new_data.connect(self.update_plot)
+        self.session.sweep_completed.connect(self.pass_completed)
+        self.session.finished.connect(self.sweep_finished)
+        self.session.error.connect(self.handle_error)
+        
+        # Track sweep status.
+        self.sweep_running = False
+        self.sweep_paused = False
+
+    def set_status(self, state):
+        """
+        Set the probe status indicator color.
+        """
+        colors = {"ready": "green", "running": "red", "paused": "yellow", "offline": "grey"}
+        color = colors.get(state, "grey")
+        self.status_indicator.setStyleSheet(f"background-color: {color}; border: 1px solid black;")
+        
+    def discover_instruments(self):
+        """
+        List the available VISA instruments in the resources field.
+        """
+        try:
+            resources = self.session.discover()
+            self.resources_edit.setText(", ".join(resources))
+            if not resources:
+                QtWidgets.QMessageBox.warning(self, "Discover", "No VISA instruments found.")
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Discover Error", str(e))
+
+    def connect_instrument(self):
+        """
+        Attempt to connect to the listed instruments (or all discovered ones) via pyvisa.
+        """
+        try:
+            resources = [r.strip() for r in self.resources_edit.text().split(",") if r.strip()]
+            names = self.session.open(resources)
+            self.resources_edit.setText(", ".join(names))
+            self.set_status("ready")
+            QtWidgets.QMessageBox.information(self, "Success", f"{len(names)} instrument(s) connected and initialized.")
+        except Exception as e:
+            self.set_status("offline")
+            QtWidgets.QMessageBox.critical(self, "Connection Error", f"Failed to connect: {str(e)}")
+        
+    def start_sweep(self):
+        """
+        Read the user parameters, reset any previous data, and start the IV sweep
+        in a new thread using SweepWorker.
+        """
+        if not self.session.smus:
+            QtWidgets.QMessageBox.warning(self, "Error", "Instrument not connected!")
+            return
+        
+        try:
+            current_limit = float(self.current_limit_edit.text())
+            min_voltage = float(self.min_voltage_edit.text())
+            max_voltage = float(self.max_voltage_edit.text())
+            sensitivity = self.sensitivity_spin.value() * 1e-6
+            mode = self.mode_combo.currentData()
+            list_step = self.list_step_spin.value()
+            dwell = self.dwell_spin.value()
+            settle_tolerance = self.settle_spin.value() / 100
+            repeat = self.repeat_spin.value()
+            bidirectional = self.bidirectional_check.isChecked()
+            synchronized = self.synchronized_check.isChecked()
+            planner = self.planner_combo.currentData()
+            point_budget = self.point_budget_spin.value()
+        except ValueError:
+            QtWidgets.QMessageBox.warning(self, "Input Error", "Please enter valid numeric parameters.")
+            return
+        
+        if min_voltage >= max_voltage:
+            QtWidgets.QMessageBox.warning(self, "Input Error", "Min Voltage must be less than Max Voltage.")
+            return
+        
+        # Clear previous data and reset the plot. The x-axis is preset to the
+        # sweep range so that live updates rarely need a full redraw.
+        xpad = (max_voltage - min_voltage) * PLOT_MARGIN
+        self.sweep_xlim = (min_voltage - xpad, max_voltage + xpad)
+        names = self.session.names
+        self.set_sources(names)
+        self.samples_received = 0
+        self.refresh_plot()
+        self.canvas.ax.set_xlim(*self.sweep_xlim)
+        
+        # Every sweep is streamed to disk as it is acquired (one log per instrument;
+        # a name already taken gets a numbered suffix, see acquisition_log.py).
+        stamp = time.strftime("sweep_%Y%m%d_%H%M%S")
+        if len(names) == 1:
+            log_paths = {names[0]: os.path.join(LOG_DIR, stamp + LOG_EXTENSION)}
+        else:
+            log_paths = {name: os.path.join(LOG_DIR, f"{stamp}_probe{i}{LOG_EXTENSION}") for i, name in enumerate(names)}
+        
+        # Create and start one sweep thread per instrument.
+        def make_worker(resource, smu, start_barrier):
+            return SweepWorker(smu, current_limit, min_voltage, max_voltage, sensitivity,
+                               mode=mode, list_step=list_step, dwell=dwell,
+                               settle_tolerance=settle_tolerance, log_path=log_paths[resource],
+                               metadata=dict(self.probe_geometry(), resource=resource),
+                               repeat=repeat, bidirectional=bidirectional, start_barrier=start_barrier,
+                               planner=planner, point_budget=point_budget)
+        workers = self.session.start(make_worker, synchronized)
+        self.run_metadata = workers[names[0]].parameters()
+        if len(names) > 1:
+            self.run_metadata["probes"] = names
+
+        self.sweep_running = True
+        self.sweep_paused = False
+        self.stopped_converged = False
+        self.pause_button.setText("Pause")
+        self.set_status("running")
+        
+    def set_sources(self, names):
+        """
+        Start a new data set with one buffer and live line per source (instrument
+        resource or file). The first source becomes self.data.
+        """
+        self.session_data.reset(names)
+        self.data = self.session_data[names[0]]
+        for name, line in self.lines.items():
+            if line is not self.line:
+                line.remove()
+        self.lines = {names[0]: self.line}
+        for i, name in enumerate(names[1:]):
+            self.lines[name], = self.canvas.ax.plot([], [], 'o-', color=PROBE_COLORS[i % len(PROBE_COLORS)],
+                                                    animated=True)
+        legend = self.canvas.ax.get_legend()
+        if legend is not None:
+            legend.remove()
+        if len(names) > 1:
+            self.canvas.ax.legend(list(self.lines.values()), names, fontsize="small")
+        self.live_starts = dict.fromkeys(names, 0)
+        self.reset_passes()
+
+    def reset_bounds(self):
+        """
+        Recompute the data bounds (x, y and |y| for log scale) from all data.
+        """
+        self.bounds = [np.inf, -np.inf, np.inf, -np.inf, np.inf, -np.inf]
+        for buffer in self.session_data.buffers.values():
+            if not buffer:
+                continue
+            voltages, currents = buffer.voltages, buffer.currents
+            magnitudes = np.abs(currents[currents != 0])
+            self.extend_bounds(voltages.min(), currents.min())
+            self.extend_bounds(voltages.max(), currents.max())
+            if len(magnitudes):
+                self.bounds[4] = min(self.bounds[4], magnitudes.min())
+                self.bounds[5] = max(self.bounds[5], magnitudes.max())
+
+    def extend_bounds(self, voltage, current):
+        """
+        Grow the data bounds by one point.
+        """
+        b = self.bounds
+        b[0], b[1] = min(b[0], voltage), max(b[1], voltage)
+        b[2], b[3] = min(b[2], current), max(b[3], current)
+        if current != 0:
+            b[4], b[5] = min(b[4], abs(current)), max(b[5], abs(current))
+
+    def fit_limits(self, grow=True):
+        """
+        Make sure the axes limits contain the data bounds. With grow=True the
+        current limits are only ever extended. Returns True if the limits
+        changed (which needs a full redraw), False if a blit is enough.
+        """
+        ax = self.canvas.ax
+        xmin, xmax, ymin, ymax, amin, amax = self.bounds
+        log = ax.get_yscale() == "log"
+        if log:
+            ymin, ymax = amin, amax
+        if not (np.isfinite(xmin) and np.isfinite(ymin)):
+            return False
+        (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+        if grow and x0 <= xmin and xmax <= x1 and y0 <= ymin and ymax <= y1:
+            return False
+
+        # Pad by a margin of the span so that limits change only occasionally.
+        xpad = (xmax - xmin) * PLOT_MARGIN or 1.0
+        if log:
+            ylo, yhi = ymin / 2, ymax * 2
+        else:
+            ypad = (ymax - ymin) * PLOT_MARGIN or abs(ymax) * PLOT_MARGIN or 1e-9
+            ylo, yhi = ymin - ypad, ymax + ypad
+        xlo, xhi = xmin - xpad, xmax + xpad
+        if self.sweep_xlim is not None:
+            xlo, xhi = min(xlo, self.sweep_xlim[0]), max(xhi, self.sweep_xlim[1])
+        if grow:
+            xlo, xhi, ylo, yhi = min(x0, xlo), max(x1, xhi), min(y0, ylo), max(y1, yhi)
+        ax.set_xlim(xlo, xhi)
+        ax.set_ylim(ylo, yhi)
+        return True
+
+    def on_canvas_draw(self, event):
+        """
+        After every full draw, cache the background and paint the live line on top.
+        """
+        self.plot_background = self.canvas.copy_from_bbox(self.canvas.ax.bbox)
+        for line in self.lines.values():
+            self.canvas.ax.draw_artist(line)
+
+    def set_line_data(self):
+        """
+        Push the (decimated) data of the current pass into the line artists.
+        """
+        log = self.canvas.ax.get_yscale() == "log"
+        for name, line in self.lines.items():
+            buffer = self.session_data[name]
+            live_voltages = buffer.voltages[self.live_starts[name]:]
+            live_currents = buffer.currents[self.live_starts[name]:]
+            if self.run_metadata.get("mode") == "refine":
+                # Refined points arrive after the coarse scan; draw in voltage order.
+                order = np.argsort(live_voltages, kind="stable")
+                live_voltages, live_currents = live_voltages[order], live_currents[order]
+            step = max(1, len(live_voltages) // MAX_PLOT_POINTS)
+            voltages = live_voltages[::step]
+            currents = live_currents[::step]
+            if step > 1 and len(live_voltages) % step != 1:
+                voltages = np.append(voltages, live_voltages[-1])
+                currents = np.append(currents, live_currents[-1])
+            line.set_data(voltages, np.abs(currents) if log else currents)
+
+    def refresh_plot(self):
+        """
+        Update the plot line data with a full redraw (rescaling the axes to the data).
+        """
+        self.reset_bounds()
+        self.set_line_data()
+        if not self.fit_limits(grow=False):
+            self.canvas.ax.relim()
+            self.canvas.ax.autoscale_view()
+        self.limits_initialized = bool(self.data)
+        self.draw_canvas()
+
+    def draw_canvas(self):
+        """
+        Full redraw of the figure (timed as "draw").
+        """
+        start = time.perf_counter()
+        self.canvas.draw()
+        self.perf.add("draw", start, time.perf_counter() - start)
+
+    def render_pending(self):
+        """
+        Timer slot: draw the points received since the last frame. Only the line
+        is blitted unless new points fall outside the current axes limits.
+        """
+        now = time.perf_counter()
+        if self.last_frame is not None and self.sweep_running:
+            missed = int((now - self.last_frame) * 1000 / PLOT_INTERVAL_MS) - 1
+            if missed > 0:
+                self.perf.increment("dropped_frames", missed)
+        self.last_frame = now
+        if not self.plot_dirty:
+            return
+        self.plot_dirty = False
+        self.stream_to_analysis()
+        self.show_estimate()
+        self.latency_label.setText(f"I/O: {self.last_io_latency * 1e3:.1f} ms  Settle: {self.last_settle_time * 1e3:.0f} ms")
+        self.set_line_data()
+        grow = self.limits_initialized
+        self.limits_initialized = True
+        if self.fit_limits(grow) or self.plot_background is None:
+            self.draw_canvas()
+            return
+        start = time.perf_counter()
+        self.canvas.restore_region(self.plot_background)
+        for line in self.lines.values():
+            self.canvas.ax.draw_artist(line)
+        self.canvas.blit(self.canvas.ax.bbox)
+        self.perf.add("blit", start, time.perf_counter() - start)
+
+    def stream_to_analysis(self):
+        """
+        Pass the samples added to self.data since the last call on to the
+        analysis window (if it shows this data).
+        """
+        if self.data is not self.streamed_data:
+            self.streamed_data = self.data
+            self.streamed = 0
+            self.analysis.reset_stream()
+        if len(self.data) <= self.streamed:
+            return
+        if self.analysis.shown:
+            if len(self.data) - self.streamed > STREAM_RESYNC_POINTS:
+                # Too much for the ring (e.g. a loaded file): resend it all.
+                try:
+                    self.analysis.show(self.data.pairs(), live=True)
+                except RuntimeError:
+                    pass
+            else:
+                self.analysis.stream(self.data.voltages[self.streamed:], self.data.currents[self.streamed:])
+        self.streamed = len(self.data)
+
+    def update_plot(self, resource, sample):
+        """
+        Append a new sample from one instrument; the plot is redrawn by the frame timer.
+        """
+        timestamp, set_voltage, voltage, current, settle_time, io_latency = sample
+        self.last_io_latency = io_latency
+        self.last_settle_time = settle_time
+        self.samples_received += 1
+        self.session_data.append(resource, sample)
+        self.extend_bounds(voltage, current)
+        self.plot_dirty = True
+        if self.session_data[resource] is self.data:
+            self.estimator.update(voltage, current)
+            if self.estimator.converged and self.stop_converged_check.isChecked() and not self.stopped_converged:
+                self.stopped_converged = True
+                self.session.request_stop()
+
+    def show_estimate(self):
+        """
+        Show the live T_e/V_f estimates of the pass in progress.
+        """
+        t_ev, v_f = self.estimator.t_ev, self.estimator.v_f
+        text = f"Te {t_ev:.2f} eV" if t_ev is not None else "Te -- eV"
+        text += f"  Vf {v_f:.2f} V" if v_f is not None else "  Vf -- V"
+        if self.estimator.converged:
+            text += " (converged)"
+        self.estimate_label.setText(text)
+
+    def reset_passes(self):
+        """
+        Forget pass boundaries and the running average (new data in the buffer).
+        """
+        self.sweep_starts = [0]
+        self.sweep_count_label.setText("")
+        self.estimator.reset()
+        self.show_estimate()
+        self.average = None
+        self.average_line.set_data([], [])
+        if self.average_band is not None:
+            self.average_band.remove()
+            self.average_band = None
+
+    def pass_completed(self, resource, block):
+        """
+        A pass of a repeated sweep finished: start the instrument's live line
+        afresh for the next pass and (for the primary instrument) update the
+        running-average overlay.
+        """
+        if self.run_metadata.get("repeat", 1) == 1:
+            return
+        self.render_pending()
+        self.live_starts[resource] = len(self.session_data[resource])
+        if self.session_data[resource] is not self.data:
+            return
+        self.sweep_starts.append(len(self.data))
+        self.estimator.reset()
+        self.average = block["average"]
+        self.sweep_count_label.setText(f"Sweeps: {self.average['n_sweeps']}")
+        self.draw_average(self.average)
+
+    def draw_average(self, average):
+        """
+        Plot the running mean with a +/- 1 standard deviation band.
+        """
+        log = self.canvas.ax.get_yscale() == "log"
+        centers, mean, std = average["centers"], average["mean"], average["std"]
+        self.average_line.set_data(centers, np.abs(mean) if log else mean)
+        if self.average_band is not None:
+            self.average_band.remove()
+            self.average_band = None
+        if average["n_sweeps"] > 1 and not log:
+            self.average_band = self.canvas.ax.fill_between(centers, mean - std, mean + std,
+                                                            color="red", alpha=0.2, linewidth=0)
+        self.draw_canvas()
+
+    def update_perf_panel(self):
+        """
+        Timer slot: show acquisition rate, mean I/O time, signal queue depth,
+        mean draw time and dropped frames over the last panel interval.
+        """
+        counters = [smu.perf for smu in self.session.smus.values()]
+        current = (time.perf_counter(), self.samples_received,
+                   sum(perf.total("io") for perf in counters), sum(perf.count("io") for perf in counters),
+                   self.perf.total("draw") + self.perf.total("blit"),
+                   self.perf.count("draw") + self.perf.count("blit"))
+        previous, self.perf_previous = self.perf_previous, current
+        if previous is None:
+            return
+        elapsed, received, io_time, io_count, draw_time, draw_count = (c - p for c, p in zip(current, previous))
+        depth = sum(worker.emitted for worker in self.session.workers.values()) - self.samples_received
+        io = f"{io_time / io_count * 1e3:.1f} ms" if io_count else "--"
+        draw = f"{draw_time / draw_count * 1e3:.0f} ms" if draw_count else "--"
+        self.perf_label.setText(f"{received / elapsed:.0f} pts/s  I/O {io}  Queue {max(depth, 0)}  "
+                                f"Draw {draw}  Dropped {self.perf.count('dropped_frames')}")
+
+    def save_trace(self):
+        """
+        Save the recent timing events of the GUI and all instruments as a
+        Chrome trace (chrome://tracing, ui.perfetto.dev).
+        """
+        filename, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save Perf Trace", "", "Trace Files (*.json)")
+        if filename:
+            try:
+                counters = [self.perf] + [smu.perf for smu in self.session.smus.values()]
+                write_trace(filename, counters)
+                QtWidgets.QMessageBox.information(self, "Saved", f"Trace saved to {filename}")
+            except Exception as e:
+                QtWidgets.QMessageBox.critical(self, "Save Error", str(e))
+
+    def pause_resume(self):
+        """
+        Toggle the pause/resume state of the sweep.
+        """
+        if not self.session.workers:
+            return
+        if self.sweep_paused:
+            self.session.resume()
+            self.sweep_paused = False
+            self.pause_button.setText("Pause")
+            self.set_status("running")
+        else:
+            self.session.pause()
+            self.sweep_paused = True
+            self.pause_button.setText("Resume")
+            self.set_status("paused")
+        
+    def stop_sweep(self):
+        """
+        Stop the sweep and safely disconnect the instruments.
+        """
+        self.session.close()
+        self.set_status("offline")
+        QtWidgets.QMessageBox.information(self, "Sweep Cancelled", "Sweep cancelled.")
+        self.sweep_running = False
+        
+    def sweep_finished(self):
+        """
+        Called when the sweeps on all instruments have finished.
+        """
+        self.sweep_running = False
+        self.render_pending()
+        self.set_status("ready")
+        logs = "\n".join(worker.log_path for worker in self.session.workers.values())
+        if self.stopped_converged:
+            QtWidgets.QMessageBox.information(self, "Sweep Completed",
+                                              f"Sweep stopped: Te/Vf converged.\nLog: {logs}")
+            return
+        QtWidgets.QMessageBox.information(self, "Sweep Completed", f"Sweep finished successfully.\nLog: {logs}")
+        
+    def handle_error(self, error_msg):
+        """
+        Display an error message and stop the sweep.
+        """
+        QtWidgets.QMessageBox.critical(self, "Sweep Error", error_msg)
+        self.stop_sweep()
+        
+    def toggle_scale(self):
+        """
+        Toggle the y-axis scale between linear and logarithmic.
+        """
+        if not self.data:
+            QtWidgets.QMessageBox.warning(self, "No Data", "No data available to toggle scale.")
+            return
+        current_scale = self.canvas.ax.get_yscale()
+        self.canvas.ax.set_yscale("log" if current_scale == "linear" else "linear")
+        self.refresh_plot()
+        if self.average is not None:
+            self.draw_average(self.average)
+
+    def save_data_to_csv(self):
+        """
+        Save the current data to a CSV file, or to a binary run file that also
+        keeps the sweep parameters and probe geometry. With several instruments
+        the merged, timestamp-ordered data of all of them is saved.
+        """
+        if not self.data:
+            QtWidgets.QMessageBox.warning(self, "No Data", "No data available to save.")
+            return
+        filename, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Save Data", "", f"CSV Files (*.csv);;Run Files (*{RUN_EXTENSION})")
+        if filename:
+            try:
+                if len(self.session_data) > 1:
+                    self.save_merged(filename)
+                elif filename.endswith(RUN_EXTENSION):
+                    sweep_starts = [start for start in self.sweep_starts if start < len(self.data)]
+                    sweep_starts = sweep_starts if len(sweep_starts) > 1 else None
+                    save_run(filename, self.data.columns(), dict(self.run_metadata, **self.probe_geometry()),
+                             sweep_starts=sweep_starts)
+                else:
+                    df = pd.DataFrame({CSV_HEADERS[name]: column for name, column in self.data.columns(CSV_HEADERS).items()})
+                    df.to_csv(filename, index=False)
+                QtWidgets.QMessageBox.information(self, "Saved", f"Data saved to {filename}")
+            except Exception as e:
+                QtWidgets.QMessageBox.critical(self, "Save Error", str(e))
+                
+    def save_merged(self, filename):
+        """
+        Save the data of all instruments, with the source of every row in a
+        "probe" column (index into the "probes" metadata list in run files).
+        """
+        merged = self.session_data.merged()
+        names = self.session_data.names
+        if filename.endswith(RUN_EXTENSION):
+            save_run(filename, merged, dict(self.run_metadata, probes=names, **self.probe_geometry()))
+        else:
+            df = pd.DataFrame({header: merged[name] for name, header in CSV_HEADERS.items()})
+            df["Probe"] = np.array(names)[merged["probe"]]
+            df.to_csv(filename, index=False)
+
+    def save_plot_to_png(self):
+        """
+        Save the current plot to a PNG image file.
+        """
+        if not self.data:
+            QtWidgets.QMessageBox.warning(self, "No Data", "No data available to save plot.")
+            return
+        filename, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save Plot", "", "PNG Files (*.png)")
+        if filename:
+            try:
+                self.canvas.figure.savefig(filename)
+                QtWidgets.QMessageBox.information(self, "Saved", f"Plot saved to {filename}")
+            except Exception as e:
+                QtWidgets.QMessageBox.critical(self, "Save Error", str(e))
+                
+    def upload_csv(self):
+        """
+        Load voltage/current data from a CSV file (or an acquisition log or run
+        file) and update the plot.
+        """
+        filename, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "Open CSV", "",
+            f"Sweep Data (*.csv *{LOG_EXTENSION} *{RUN_EXTENSION});;CSV Files (*.csv);;"
+            f"Acquisition Logs (*{LOG_EXTENSION});;Run Files (*{RUN_EXTENSION})")
+        if filename.endswith(RUN_EXTENSION):
+            self.load_run_file(filename)
+            return
+        if filename:
+            try:
+                self.run_metadata = {}
+                if filename.endswith(LOG_EXTENSION):
+                    df = log_to_dataframe(filename)
+                    self.run_metadata = read_log_metadata(filename)
+                else:
+                    df = pd.read_csv(filename)
+                if "Voltage (V)" in df.columns and "Current (A)" in df.columns:
+                    self.set_sources([filename])
+                    self.data.extend(**{name: df[header].to_numpy(dtype=float)
+                                        for name, header in CSV_HEADERS.items() if header in df.columns})
+                    self.sweep_xlim = None
+                    self.refresh_plot()
+                    QtWidgets.QMessageBox.information(self, "File Loaded", "CSV data loaded successfully.")
+                else:
+                    QtWidgets.QMessageBox.warning(self, "File Error", "CSV does not contain required columns 'Voltage (V)' and 'Current (A)'.")
+            except Exception as e:
+                QtWidgets.QMessageBox.critical(self, "File Error", str(e))
+
+    def load_run_file(self, filename):
+        """
+        Load a run file into the sample buffer (only the columns the buffer keeps).
+        """
+        try:
+            run = RunFile(filename)
+            if "voltage" not in run.names or "current" not in run.names:
+                QtWidgets.QMessageBox.warning(self, "File Error", "Run file does not contain voltage and current columns.")
+                return
+            self.set_sources([filename])
+            self.data.extend(**run.columns([name for name in SAMPLE_FIELDS if name in run.names]))
+            self.sweep_starts = [int(start) for start in run.sweep_starts]
+            self.run_metadata = run.metadata
+            length = self.run_metadata.get("probe_length_mm")
+            radius = self.run_metadata.get("probe_radius_mm")
+            if length is not None:
+                self.probe_length_edit.setText(f"{length:g}")
+            if radius is not None:
+                self.probe_radius_edit.setText(f"{radius:g}")
+            self.sweep_xlim = None
+            self.refresh_plot()
+            QtWidgets.QMessageBox.information(self, "File Loaded", f"Run file loaded ({len(run)} points).")
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "File Error", str(e))
+
+    def probe_geometry(self):
+        """
+        Probe geometry entered by the user, as metadata (empty fields are omitted).
+        """
+        geometry = {}
+        for key, edit in (("probe_length_mm", self.probe_length_edit), ("probe_radius_mm", self.probe_radius_edit)):
+            try:
+                geometry[key] = float(edit.text())
+            except ValueError:
+                pass
+        return geometry
+
+    def open_analysis_window(self):
+        if not self.data:
+            QtWidgets.QMessageBox.warning(
+                self, "No Data",
+                "No data available for analysis. Please run a sweep or upload CSV data first."
+            )
+            return
+        self.stream_to_analysis()
+        try:
+            self.analysis.show(self.data.pairs())
+        except RuntimeError as e:
+            QtWidgets.QMessageBox.critical(self, "Analysis Window", str(e))
+
+    def closeEvent(self, event):
+        """
+        Stop the analysis process together with the main window.
+        """
+        self.analysis.close()
+        super().closeEvent(event)
+
+def main():
+    app = QtWidgets.QApplication(sys.argv)
+    window = MainWindow()
+    window.show()
+    sys.exit(app.exec_())
+
+if __name__ == '__main__':
+    main()
+    
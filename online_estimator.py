@@ -0,0 +1,144 @@
+import math
+from collections import deque
+
+# =============================================================================
+# OnlineEstimator: T_e and V_f estimates that follow a sweep as it is acquired.
+#
+# Each sample costs O(1):
+#   V_f   every sign change of the current between consecutive samples is
+#         linearly interpolated; V_f is the mean of the crossings (noise near
+#         V_f gives a cluster of crossings around the true value)
+#   I_ion the most negative current so far (ion saturation)
+#   T_e   above V_f a least-squares line is fitted to ln(I - I_ion) over a
+#         sliding window (at least `points` samples spanning at least `span`
+#         volts, kept as running sums); T_e = 1 / the steepest slope seen, as
+#         in langmuir_fit.retarding_slope_temperature
+# The knee (plasma potential) is taken as passed once the local slope falls
+# below knee_fraction of the steepest one of the run. The estimates count as
+# converged when, past the knee, that slope has not grown by more than
+# `tolerance` for settle_points samples, and the window it came from spans
+# no more than `resolution` T_e (a coarse scan does not resolve the
+# exponential and overestimates T_e).
+#
+# T_e needs the ion side first, so it is estimated on upward passes only
+# (downward passes report V_f). A jump back in voltage (the refine scan of
+# coarse + refine mode) starts a new run: the local window and the crossing
+# detection restart and convergence has to be shown again within the run;
+# the estimates so far are kept.
+# =============================================================================
+
+
+class OnlineEstimator:
+    def __init__(self, points=5, span=1.0, knee_fraction=0.5, settle_points=10,
+                 tolerance=0.02, resolution=2.0):
+        self.points = points
+        self.span = span
+        self.knee_fraction = knee_fraction
+        self.settle_points = settle_points
+        self.tolerance = tolerance
+        self.resolution = resolution
+        self.reset()
+
+    def reset(self):
+        """
+        Forget everything (start of a new pass).
+        """
+        self.count = 0
+        self.previous = None
+        self.direction = 0
+        self.i_ion = 0.0
+        self.crossings = 0
+        self.crossing_sum = 0.0
+        self.best_slope = 0.0
+        self.best_span = 0.0
+        self.start_run()
+
+    def start_run(self):
+        self.run_best = 0.0
+        self.since_best = 0
+        self.knee_passed = False
+        self.clear_window()
+
+    def clear_window(self):
+        self.window = deque()
+        # Running sums of x = V - origin, y = ln(I - I_ion), x^2 and x*y.
+        self.origin = None
+        self.sums = [0.0, 0.0, 0.0, 0.0]
+
+    @property
+    def v_f(self):
+        return self.crossing_sum / self.crossings if self.crossings else None
+
+    @property
+    def t_ev(self):
+        return 1 / self.best_slope if self.best_slope > 0 else None
+
+    @property
+    def converged(self):
+        return (self.knee_passed and self.since_best >= self.settle_points and
+                self.best_span * self.best_slope <= self.resolution)
+
+    def update(self, voltage, current):
+        """
+        Add one measured (voltage, current) sample.
+        """
+        self.count += 1
+        self.i_ion = min(self.i_ion, current)
+        previous, self.previous = self.previous, (voltage, current)
+        if previous is not None and voltage != previous[0]:
+            direction = 1 if voltage > previous[0] else -1
+            if self.direction == 0:
+                self.direction = direction
+            elif direction != self.direction:
+                self.start_run()
+                previous = None
+        if previous is not None and (previous[1] < 0) != (current < 0) and current != previous[1]:
+            self.crossing_sum += previous[0] - previous[1] * (voltage - previous[0]) / (current - previous[1])
+            self.crossings += 1
+
+        if self.direction < 0 or not self.crossings or voltage < self.v_f or current <= self.i_ion:
+            return
+        self.push(voltage, math.log(current - self.i_ion))
+        span = voltage - self.window[0][0]
+        if len(self.window) < self.points or span < self.span:
+            return
+        slope = self.window_slope()
+        if slope > self.best_slope:
+            self.best_slope = slope
+            self.best_span = span
+        if slope > self.run_best:
+            if slope > self.run_best * (1 + self.tolerance):
+                self.since_best = 0
+            self.run_best = slope
+        else:
+            self.since_best += 1
+        if slope < self.knee_fraction * self.run_best:
+            self.knee_passed = True
+
+    def push(self, voltage, y):
+        """
+        Add a point to the window and drop the oldest ones it no longer needs.
+        """
+        if self.origin is None:
+            self.origin = voltage
+        self.add((voltage, y), 1)
+        while len(self.window) > self.points and voltage - self.window[1][0] >= self.span:
+            self.add(self.window[0], -1)
+
+    def add(self, point, sign):
+        x, y = point[0] - self.origin, point[1]
+        for k, term in enumerate((x, y, x * x, x * y)):
+            self.sums[k] += sign * term
+        if sign > 0:
+            self.window.append(point)
+        else:
+            self.window.popleft()
+
+    def window_slope(self):
+        """
+        Least-squares slope of the points in the window.
+        """
+        n = len(self.window)
+        sx, sy, sxx, sxy = self.sums
+        denom = n * sxx - sx * sx
+        return (n * sxy - sx * sy) / denom if denom > 0 else 0.0
@@ -0,0 +1,71 @@
+import os
+import json
+import time
+import threading
+from collections import defaultdict, deque
+
+# =============================================================================
+# PerfCounters: always-on timing counters for the acquisition and plot paths.
+#
+# add() costs about a microsecond: it bumps a running total, count and maximum
+# and appends one event to a bounded ring, so it can stay enabled in
+# production. Each key is written by one thread only (per instrument: I/O
+# events on the I/O thread, sweep events on the worker thread; one object for
+# the GUI); other threads only read.
+# write_trace() saves the recent events of several counter objects in the
+# Chrome trace event format (open in chrome://tracing or ui.perfetto.dev).
+# =============================================================================
+
+TRACE_CAPACITY = 200000   # events kept per counter object
+
+
+class PerfCounters:
+    def __init__(self, name="", trace_capacity=TRACE_CAPACITY):
+        self.name = name
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.maxima = defaultdict(float)
+        self.trace = deque(maxlen=trace_capacity)
+
+    def add(self, key, start, duration):
+        """
+        Record one timed event (perf_counter start and duration in seconds).
+        """
+        self.totals[key] += duration
+        self.counts[key] += 1
+        if duration > self.maxima[key]:
+            self.maxima[key] = duration
+        self.trace.append((key, start, duration, threading.get_ident()))
+
+    def increment(self, key, n=1):
+        self.counts[key] += n
+
+    def total(self, key):
+        return self.totals.get(key, 0.0)
+
+    def count(self, key):
+        return self.counts.get(key, 0)
+
+    def snapshot(self):
+        """
+        Copy of the totals, counts and maxima (safe to call from another thread).
+        """
+        return {"totals": dict(self.totals), "counts": dict(self.counts), "maxima": dict(self.maxima)}
+
+
+def write_trace(path, counters):
+    """
+    Write the trace events of the given PerfCounters to a Chrome trace JSON
+    file, with their summary snapshots as metadata.
+    """
+    pid = os.getpid()
+    events = []
+    for perf in counters:
+        for key, start, duration, thread in list(perf.trace):
+            events.append({"name": key, "cat": perf.name, "ph": "X", "pid": pid, "tid": thread,
+                           "ts": start * 1e6, "dur": duration * 1e6})
+    events.sort(key=lambda event: event["ts"])
+    summary = {perf.name: perf.snapshot() for perf in counters}
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "otherData": {"written": time.time(), "counters": summary}}, f)
+    return path
@@ -0,0 +1,149 @@
+import os
+import json
+import struct
+import numpy as np
+from acquisition_log import read_acquisition_log
+
+# =============================================================================
+# Run files (*.ivrun): columnar binary sweep archives with metadata.
+#
+# File layout:
+#   MAGIC (8 bytes) | header length (uint64, little endian) | JSON header |
+#   column blocks, each 64-byte aligned (offsets relative to the first
+#   aligned position after the header)
+#
+# The JSON header holds the metadata (sweep parameters, probe geometry, ...)
+# and, for every column, its dtype, offset and length. Columns are loaded as
+# read-only memory maps, so opening a large archive only reads the header and
+# a reader only touches the columns (and rows) it actually uses.
+#
+# A run file can hold several back-to-back sweeps: the optional "sweep_starts"
+# column gives the first row of each sweep.
+# =============================================================================
+
+MAGIC = b"IVRUN1\n\0"
+RUN_EXTENSION = ".ivrun"
+ALIGNMENT = 64
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_run(path, columns, metadata=None, sweep_starts=None):
+    """
+    Write equal-length 1-D arrays (dict name -> array) and a metadata dict.
+    sweep_starts optionally marks the first row of each sweep.
+    """
+    arrays = {name: np.ascontiguousarray(column) for name, column in columns.items()}
+    if sweep_starts is not None:
+        arrays["sweep_starts"] = np.asarray(sweep_starts, dtype=np.int64)
+
+    # Column offsets are relative to the start of the data section, which
+    # begins at the first aligned position after the header.
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "length": len(array), "offset": offset}
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({"metadata": metadata or {}, "columns": layout}).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+
+
+class RunFile:
+    def __init__(self, path):
+        """
+        Open a run file. Only the header is read here; columns are mapped on demand.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a run file.")
+            (length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(length))
+        self.data_start = _aligned(len(MAGIC) + 8 + length)
+        self.metadata = header["metadata"]
+        self.layout = header["columns"]
+        self._maps = {}
+
+    @property
+    def names(self):
+        return [name for name in self.layout if name != "sweep_starts"]
+
+    def __len__(self):
+        lengths = [self.layout[name]["length"] for name in self.names]
+        return lengths[0] if lengths else 0
+
+    def column(self, name):
+        """
+        Read-only memory-mapped view of one column.
+        """
+        if name not in self._maps:
+            info = self.layout[name]
+            if info["length"] == 0:
+                self._maps[name] = np.empty(0, dtype=info["dtype"])
+            else:
+                self._maps[name] = np.memmap(self.path, dtype=info["dtype"], mode="r",
+                                             offset=self.data_start + info["offset"], shape=(info["length"],))
+        return self._maps[name]
+
+    def columns(self, names=None):
+        return {name: self.column(name) for name in (names or self.names)}
+
+    @property
+    def sweep_starts(self):
+        if "sweep_starts" in self.layout:
+            return self.column("sweep_starts")
+        return np.zeros(1, dtype=np.int64)
+
+    @property
+    def n_sweeps(self):
+        return len(self.sweep_starts)
+
+    def sweep(self, index, names=None):
+        """
+        Views of the given columns for one sweep of a multi-sweep file.
+        """
+        starts = self.sweep_starts
+        start = int(starts[index])
+        stop = int(starts[index + 1]) if index + 1 < len(starts) else len(self)
+        return {name: column[start:stop] for name, column in self.columns(names).items()}
+
+    def pairs(self, index=None):
+        """
+        (N, 2) voltage/current array for the whole file or one sweep.
+        """
+        if index is None:
+            data = self.columns(["voltage", "current"])
+        else:
+            data = self.sweep(index, ["voltage", "current"])
+        return np.column_stack((data["voltage"], data["current"]))
+
+
+def load_run(path, names=None):
+    """
+    Convenience loader: (dict of memory-mapped columns, metadata).
+    """
+    run = RunFile(path)
+    return run.columns(names), run.metadata
+
+
+def log_to_run(log_path, run_path=None, metadata=None):
+    """
+    Convert an acquisition log (*.ivlog) into a run file. Returns the run file path.
+    """
+    records, log_metadata = read_acquisition_log(log_path)
+    if run_path is None:
+        run_path = os.path.splitext(log_path)[0] + RUN_EXTENSION
+    save_run(run_path, {name: records[name] for name in records.dtype.names},
+             dict(log_metadata, **(metadata or {})))
+    return run_path
@@ -0,0 +1,112 @@
+import numpy as np
+
+# =============================================================================
+# SampleBuffer: growable, array-backed store for acquired sweep samples.
+#
+# Each column is a preallocated float64 array that doubles when full, so
+# appending is amortized O(1). Readers get zero-copy views of the filled part.
+# Samples are never dropped: the GUI refers to them by absolute index (start
+# of each pass, the part already drawn or sent to the analysis window). At
+# 48 bytes per sample, continuous sweeping at 100 samples/s takes ~17 MB/hour.
+# =============================================================================
+
+# Column order of one sample, as emitted by SweepWorker.new_data.
+SAMPLE_FIELDS = ("timestamp", "set_voltage", "voltage", "current", "settle_time", "io_latency")
+SAMPLE_DTYPE = np.dtype([(name, np.float64) for name in SAMPLE_FIELDS])
+
+# Column headers used when exporting to CSV; voltage/current stay first so the
+# files remain readable by everything that expects "Voltage (V),Current (A)".
+CSV_HEADERS = {
+    "voltage": "Voltage (V)",
+    "current": "Current (A)",
+    "set_voltage": "Set Voltage (V)",
+    "timestamp": "Timestamp (s)",
+    "settle_time": "Settle Time (s)",
+    "io_latency": "I/O Latency (s)",
+}
+
+
+class SampleBuffer:
+    def __init__(self, capacity=1024):
+        """
+        Create an empty buffer with room for capacity samples.
+        """
+        self._columns = {name: np.empty(capacity) for name in SAMPLE_FIELDS}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    @property
+    def capacity(self):
+        return len(self._columns["voltage"])
+
+    def clear(self):
+        self._size = 0
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if needed > self.capacity:
+            capacity = max(needed, 2 * self.capacity)
+            for name, column in self._columns.items():
+                grown = np.empty(capacity)
+                grown[:self._size] = column[:self._size]
+                self._columns[name] = grown
+
+    def append(self, timestamp, set_voltage, voltage, current, settle_time=0.0, io_latency=0.0):
+        """
+        Add one sample (fields in SAMPLE_FIELDS order).
+        """
+        self._reserve(1)
+        i = self._size
+        c = self._columns
+        c["timestamp"][i] = timestamp
+        c["set_voltage"][i] = set_voltage
+        c["voltage"][i] = voltage
+        c["current"][i] = current
+        c["settle_time"][i] = settle_time
+        c["io_latency"][i] = io_latency
+        self._size = i + 1
+
+    def extend(self, **columns):
+        """
+        Add many samples at once from equal-length column arrays. Missing
+        columns are filled with NaN (e.g. timestamps for imported CSV data).
+        """
+        n = len(next(iter(columns.values())))
+        self._reserve(n)
+        for name, column in self._columns.items():
+            column[self._size:self._size + n] = columns.get(name, np.nan)
+        self._size += n
+
+    def column(self, name):
+        """
+        Zero-copy, read-only view of one column. The view is a snapshot: it does
+        not see samples appended after the buffer has grown.
+        """
+        view = self._columns[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def voltages(self):
+        return self.column("voltage")
+
+    @property
+    def currents(self):
+        return self.column("current")
+
+    def columns(self, names=SAMPLE_FIELDS):
+        """
+        Dict of zero-copy views, e.g. for building a DataFrame.
+        """
+        return {name: self.column(name) for name in names}
+
+    def pairs(self):
+        """
+        (N, 2) array of (voltage, current) pairs, as used by the analysis code.
+        """
+        return np.column_stack((self.voltages, self.currents))
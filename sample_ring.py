@@ -0,0 +1,101 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+# =============================================================================
+# SampleRing: shared-memory ring of (voltage, current) pairs for streaming a
+# running sweep from the main window to the analysis process.
+#
+# One writer (the GUI thread) and one reader (the analysis process). The
+# header holds a running sequence number (samples ever written), an epoch
+# that is bumped when the data is reset (new sweep or file) with the
+# sequence number the epoch started at, and the capacity. The writer stores
+# the samples first and advances the sequence number afterwards; the reader
+# keeps its own position, copies whatever is new and re-checks the sequence
+# number, so samples overwritten while they were copied are dropped instead
+# of returned torn. Nothing is copied but the new samples.
+# =============================================================================
+
+RING_CAPACITY = 1 << 16   # samples (1 MiB)
+
+SEQ, EPOCH, EPOCH_START, CAPACITY = range(4)
+HEADER_BYTES = 4 * 8
+
+
+class SampleRing:
+    def __init__(self, capacity=RING_CAPACITY, name=None):
+        """
+        Create a ring, or attach to an existing one by name.
+        """
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + capacity * 16)
+            self.header = np.ndarray(4, dtype=np.int64, buffer=self.shm.buf)
+            self.header[:] = (0, 0, 0, capacity)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.header = np.ndarray(4, dtype=np.int64, buffer=self.shm.buf)
+        self.capacity = int(self.header[CAPACITY])
+        self.data = np.ndarray((self.capacity, 2), dtype=np.float64, buffer=self.shm.buf, offset=HEADER_BYTES)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def seq(self):
+        return int(self.header[SEQ])
+
+    @property
+    def epoch(self):
+        return int(self.header[EPOCH])
+
+    @property
+    def epoch_start(self):
+        return int(self.header[EPOCH_START])
+
+    def extend(self, voltages, currents):
+        """
+        Writer: append samples (only the newest capacity are kept).
+        """
+        n = len(voltages)
+        if n == 0:
+            return
+        seq = int(self.header[SEQ])
+        skip = max(0, n - self.capacity)
+        start = (seq + skip) % self.capacity
+        count = n - skip
+        first = min(count, self.capacity - start)
+        self.data[start:start + first, 0] = voltages[skip:skip + first]
+        self.data[start:start + first, 1] = currents[skip:skip + first]
+        self.data[:count - first, 0] = voltages[skip + first:]
+        self.data[:count - first, 1] = currents[skip + first:]
+        self.header[SEQ] = seq + n
+
+    def reset(self):
+        """
+        Writer: start a new epoch (readers drop what they have).
+        """
+        self.header[EPOCH_START] = self.header[SEQ]
+        self.header[EPOCH] += 1
+
+    def read(self, position):
+        """
+        Reader: samples written since position, as (voltages, currents,
+        new position, number of samples lost to overwriting).
+        """
+        seq = int(self.header[SEQ])
+        start = max(position, seq - self.capacity)
+        indices = np.arange(start, seq) % self.capacity
+        pairs = self.data[indices]
+        # Anything the writer wrapped over during the copy is not trusted.
+        oldest = min(int(self.header[SEQ]) - self.capacity, seq)
+        if oldest > start:
+            pairs = pairs[oldest - start:]
+            start = oldest
+        return pairs[:, 0], pairs[:, 1], seq, start - position
+
+    def close(self):
+        self.header = self.data = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
@@ -0,0 +1,127 @@
+import os
+import numpy as np
+import scipy.special as special
+from scipy.integrate import quad
+
+###########################################################################################
+
+# Planar electron-sheath integral, tabulated once and cached on disk.
+#
+# The planar electron-collection branch of the probe model needs
+#
+#     F(y) = integral_0^y  1 / sqrt(2 * G(y'))  dy'
+#     G(y) = integral_0^y  eta(y'')  dy''
+#
+# Evaluating that with nested quad() costs ~0.2 s per point.  Here F is computed
+# once on a dense grid in s = sqrt(y) (F ~ 2*sqrt(y) near zero, so it is smooth in s)
+# and every later evaluation is a single vectorized np.interp.
+
+###########################################################################################
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TABLE_PATH = os.path.join(BASE_DIR, "planar_sheath_table.npz")
+
+TABLE_VERSION = 1
+S_MAX = 100.0          # table covers 0 <= y <= S_MAX**2
+N_POINTS = 2**15 + 1   # stored grid size
+OVERSAMPLE = 8         # integration grid is this much finer than the stored grid
+
+
+def coeft(x):
+    return (np.sqrt(np.pi) / 2) * special.erfcx(x) ##special function for exp(x**2) * erfcx(x), which is simply g(x) as defined in the paper
+
+
+def eta(y):
+    return (1 / np.sqrt(np.pi)) * coeft(np.sqrt(y))
+
+
+def inner_integral(y_prime):
+    result, _ = quad(eta, 0, y_prime)
+    return result
+
+
+def outer_integral(y):
+    """
+    Reference (slow) nested-quad evaluation of F(y). Kept for validating the table.
+    """
+    def integrand(y_prime):
+        inner = inner_integral(y_prime)
+        if inner == 0:
+            return 0
+        return 1 / np.sqrt(2 * inner)
+
+    result, _ = quad(integrand, 0, y)
+    return result
+
+
+def _cumtrapz(f, x):
+    out = np.empty_like(f)
+    out[0] = 0.0
+    np.cumsum(0.5 * (f[1:] + f[:-1]) * np.diff(x), out=out[1:])
+    return out
+
+
+def build_table(s_max=S_MAX, n_points=N_POINTS, oversample=OVERSAMPLE):
+    """
+    Tabulate F(y) on a uniform grid in s = sqrt(y).
+    Returns (s, F) with F[i] = F(s[i]**2).
+    """
+    n_fine = (n_points - 1) * oversample + 1
+    t = np.linspace(0.0, s_max, n_fine)
+
+    # G(s^2) = integral_0^s t * erfcx(t) dt   (substituting y'' = t^2)
+    inner = _cumtrapz(t * special.erfcx(t), t)
+
+    # F(s^2) = integral_0^s 2t / sqrt(2 G(t^2)) dt; the integrand tends to 2 at t = 0.
+    integrand = np.empty_like(t)
+    integrand[0] = 2.0
+    integrand[1:] = 2 * t[1:] / np.sqrt(2 * inner[1:])
+    outer = _cumtrapz(integrand, t)
+
+    return t[::oversample].copy(), outer[::oversample].copy()
+
+
+def _load_or_build(path=TABLE_PATH):
+    try:
+        with np.load(path) as cached:
+            if int(cached["version"]) == TABLE_VERSION:
+                return cached["s"], cached["F"]
+    except (OSError, KeyError, ValueError):
+        pass
+
+    s, F = build_table()
+    try:
+        np.savez(path, version=TABLE_VERSION, s=s, F=F)
+    except OSError as e:
+        print(f"Could not cache sheath table to {path}: {e}")
+    return s, F
+
+
+_table = None
+
+
+def get_table():
+    """
+    Return the (s, F) table, loading it from disk (or building it) on first use.
+    """
+    global _table
+    if _table is None:
+        _table = _load_or_build()
+    return _table
+
+
+def outer_integral_lookup(y):
+    """
+    Vectorized table lookup of F(y). Matches outer_integral(): NaN for y < 0.
+    Beyond the table the large-y asymptote F ~ y**0.75 is used.
+    """
+    s_grid, F_grid = get_table()
+    y = np.asarray(y, dtype=float)
+    s = np.sqrt(np.where(y >= 0, y, np.nan))
+    F = np.interp(s, s_grid, F_grid)
+
+    s_max = s_grid[-1]
+    beyond = s > s_max
+    if np.any(beyond):
+        F = np.where(beyond, F_grid[-1] * (s / s_max)**1.5, F)
+    return np.where(np.isnan(s), np.nan, F)
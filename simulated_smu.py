@@ -0,0 +1,229 @@
+import time
+import threading
+import numpy as np
+from smu4201 import HV_THRESHOLD
+
+# =============================================================================
+# SimulatedSMU4201: stand-in for the pyvisa resource of an SMU4201.
+#
+# It answers the SCPI subset used by smu4201.SMU4201 (fixed and list sweeps,
+# HV mode, output, compliance, live readback) with currents from the Langmuir
+# probe model, so sweeps can be run, timed and regression-tested without
+# hardware. Realism knobs:
+#   latency      per-command round trip in seconds, by command prefix
+#                (longest match wins, "" is the default)
+#   byte_time    transfer time per byte sent or received (serial link)
+#   noise        gaussian current noise, relative to |I|, plus noise_floor (A)
+#   settle_tau   time constant of the current response to a voltage step
+#   time_scale   multiplies every delay (0 runs as fast as possible)
+#   curve        (voltages, currents) of a recorded sweep to replay instead
+#                of the model (linearly interpolated)
+#
+# Resource names starting with SIM_PREFIX (e.g. "SIM::INSTR") open one of
+# these instead of a real instrument (see sweep_engine.open_smu).
+# =============================================================================
+
+SIM_PREFIX = "SIM"
+DEFAULT_LATENCY = {
+    "": 0.002,
+    "MEASure": 0.005,
+    "*OPC?": 0.001,
+    "*RST": 0.05,
+}
+BYTE_TIME = 10 / 115200   # seconds per byte at 115200 baud, 8N1
+
+# Plasma of the supplied sample data (voltage sweep 23, see README).
+DEFAULT_PLASMA = {"T_ev": .9, "n_e": .65e14, "L": 12.7, "R": .8, "V_f": 55.35}
+
+
+def is_simulated(resource):
+    return resource.upper().startswith(SIM_PREFIX)
+
+
+class SimulatedSMU4201:
+    def __init__(self, latency=None, byte_time=BYTE_TIME, noise=0.0, noise_floor=0.0,
+                 settle_tau=0.0, time_scale=1.0, seed=None, curve=None, **plasma):
+        """
+        plasma overrides DEFAULT_PLASMA (T_ev, n_e, L, R, V_f as in LangmuirModel).
+        """
+        self.latency = dict(DEFAULT_LATENCY if latency is None else latency)
+        self.byte_time = byte_time
+        self.noise = noise
+        self.noise_floor = noise_floor
+        self.settle_tau = settle_tau
+        self.time_scale = time_scale
+        # Imported here: the model pulls in scipy, which scripts that only
+        # import this module for is_simulated() do not need.
+        from langmuir_model import LangmuirModel
+        self.model = LangmuirModel(**dict(DEFAULT_PLASMA, **plasma))
+        self.curve = None
+        if curve is not None:
+            voltages, currents = (np.asarray(c, dtype=float) for c in curve)
+            order = np.argsort(voltages)
+            self.curve = (voltages[order], currents[order])
+        self.rng = np.random.default_rng(seed)
+
+        # pyvisa resource attributes used by the application.
+        self.timeout = 10000
+        self.write_termination = '\n'
+        self.read_termination = '\n'
+
+        self.errors = []
+        self.command_count = 0
+        self._lock = threading.Lock()
+        self.reset()
+
+    # -------------------------------------------------------------------------
+    # pyvisa resource interface
+    # -------------------------------------------------------------------------
+    def write(self, command):
+        with self._lock:
+            self._delay(command, "")
+            for part in self._split(command):
+                self._execute(part)
+
+    def query(self, command):
+        with self._lock:
+            responses = [self._execute(part) for part in self._split(command)]
+            response = ";".join(r for r in responses if r)
+            self._delay(command, response)
+            return response
+
+    def clear(self):
+        pass
+
+    def close(self):
+        pass
+
+    # -------------------------------------------------------------------------
+    # Instrument model
+    # -------------------------------------------------------------------------
+    def reset(self):
+        self.output = False
+        self.hv = False
+        self.current_limit = 0.1
+        self.voltage_mode = "FIXED"
+        self.voltage = 0.0
+        self.list_voltages = np.empty(0)
+        self.list_dwell = 0.1
+        self.list_done_at = 0.0
+        self.list_results = np.empty((0, 2))
+        # Current response to voltage steps: I relaxes from step_from to the
+        # model value with settle_tau after the step at step_time.
+        self.step_from = 0.0
+        self.step_time = 0.0
+
+    def source_voltage(self):
+        """
+        Voltage actually applied (0 with the output off, limited without HV mode).
+        """
+        if not self.output:
+            return 0.0
+        if not self.hv:
+            return float(np.clip(self.voltage, -HV_THRESHOLD, HV_THRESHOLD))
+        return self.voltage
+
+    def probe_current(self, voltages):
+        """
+        Model current with compliance and noise for an array of applied voltages.
+        """
+        voltages = np.asarray(voltages, dtype=float)
+        if not self.output:
+            return np.zeros_like(voltages)
+        if self.curve is not None:
+            current = np.interp(voltages, *self.curve)
+        else:
+            current = self.model.total_current(voltages)
+        sigma = self.noise * np.abs(current) + self.noise_floor
+        if np.any(sigma > 0):
+            current = current + sigma * self.rng.standard_normal(np.shape(current))
+        return np.clip(current, -self.current_limit, self.current_limit)
+
+    def live_current(self):
+        target = float(self.probe_current(self.source_voltage()))
+        if self.settle_tau <= 0:
+            return target
+        elapsed = (time.perf_counter() - self.step_time) / max(self.time_scale, 1e-12)
+        return target + (self.step_from - target) * np.exp(-elapsed / self.settle_tau)
+
+    def set_voltage(self, voltage):
+        if self.settle_tau > 0:
+            self.step_from = self.live_current()
+            self.step_time = time.perf_counter()
+        self.voltage = voltage
+        if abs(voltage) >= HV_THRESHOLD and not self.hv:
+            self.errors.append(f"{voltage} V requires HV mode")
+
+    def _split(self, command):
+        return [part.strip().lstrip(":") for part in command.split(";") if part.strip()]
+
+    def _delay(self, command, response):
+        if self.time_scale <= 0:
+            return
+        header = command.split(";")[0].lstrip(":").upper()
+        prefix = max((p for p in self.latency if header.startswith(p.upper())), key=len, default=None)
+        delay = self.latency.get(prefix, 0.0) if prefix is not None else 0.0
+        delay += (len(command) + len(response) + 2) * self.byte_time
+        time.sleep(delay * self.time_scale)
+
+    def _execute(self, command):
+        """
+        Run one SCPI command; returns the response (empty for settings).
+        """
+        self.command_count += 1
+        header, _, argument = command.partition(" ")
+        key = header.upper()
+        argument = argument.strip()
+
+        if key == "*RST":
+            self.reset()
+        elif key == "*OPC?":
+            remaining = self.list_done_at - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            return "1"
+        elif key == "OUTPUT:STATE":
+            self.output = argument.upper() in ("ON", "1")
+            self.step_from, self.step_time = 0.0, time.perf_counter()
+        elif key == "SYSTEM:MODE:HV:STATE":
+            self.hv = argument in ("1", "ON")
+        elif key == "SOURCE:VOLTAGE:FIXED":
+            self.set_voltage(float(argument))
+        elif key == "SOURCE:VOLTAGE:CURRENT:LIMIT":
+            self.current_limit = float(argument)
+        elif key in ("SOURCE:FUNCTION:MODE", "SOURCE:VOLTAGE:RANGE:CURRENT:AUTO",
+                     "SOURCE:VOLTAGE:MEASURE:PRIMARY", "SOURCE:VOLTAGE:MEASURE:SECONDARY"):
+            pass
+        elif key == "MEASURE:PRIMARY:LIVEDATA?":
+            return f"{self.source_voltage():.6g}"
+        elif key == "MEASURE:SECONDARY:LIVEDATA?":
+            return f"{self.live_current():.6e}"
+        elif key == "SOURCE:VOLTAGE:MODE":
+            self.voltage_mode = argument.upper()
+        elif key == "SOURCE:LIST:VOLTAGE":
+            self.list_voltages = np.array(argument.split(","), dtype=float)
+        elif key == "SOURCE:LIST:DWELL":
+            self.list_dwell = float(argument)
+        elif key == "INITIATE":
+            self.run_list()
+        elif key == "FETCH:ARRAY?":
+            return ",".join(f"{v:.6g},{i:.6e}" for v, i in self.list_results)
+        else:
+            self.errors.append(f"Undefined header: {command}")
+            raise RuntimeError(f"Simulated SMU4201: undefined command {command!r}")
+        return ""
+
+    def run_list(self):
+        """
+        Start the uploaded list; results are ready (and *OPC? answers) after
+        the list has been dwelt through.
+        """
+        voltages = self.list_voltages
+        if not self.output:
+            voltages = np.zeros_like(voltages)
+        elif not self.hv:
+            voltages = np.clip(voltages, -HV_THRESHOLD, HV_THRESHOLD)
+        self.list_results = np.column_stack((voltages, self.probe_current(voltages)))
+        self.list_done_at = time.perf_counter() + len(voltages) * self.list_dwell * self.time_scale
+        if len(voltages):
+            self.voltage = float(self.list_voltages[-1])
@@ -0,0 +1,249 @@
+import time
+import numpy as np
+from perf_counters import PerfCounters
+
+# =============================================================================
+# SMU4201: thin command layer over a pyvisa resource for the SMU4201.
+#
+# Everything that talks SCPI to the instrument goes through here, so the sweep
+# code does not need to know command syntax. See the README note about other
+# source meters: the command strings below are the only place to change.
+# =============================================================================
+
+HV_THRESHOLD = 42.0       # |V| at or above which HV mode must be enabled
+
+# Commands for the instrument's list (hardware-timed sweep) engine. These follow
+# the SCPI conventions of the fixed-mode commands above but have not been checked
+# against the SMU4201 manual, so they are only ever sent to simulated_smu: on a
+# real instrument SweepEngine runs the same lists with step_list, which uses the
+# fixed-mode commands only.
+LIST_COMMANDS = {
+    "mode_list": "SOURce:VOLTage:MODE LIST",
+    "mode_fixed": "SOURce:VOLTage:MODE FIXed",
+    "points": "SOURce:LIST:VOLTage {values}",
+    "dwell": "SOURce:LIST:DWELl {dwell}",
+    "start": "INITiate",
+    "wait": "*OPC?",
+    "fetch": "FETCh:ARRay?",
+}
+LIST_MAX_POINTS = 1000    # largest list uploaded in one go
+
+# Primary (voltage) and secondary (current) readback in one SCPI transaction.
+MEASURE_QUERY = "MEASure:PRIMary:LIVEdata?;:MEASure:SECondary:LIVEdata?"
+PRIMARY_QUERY = "MEASure:PRIMary:LIVEdata?"
+SECONDARY_QUERY = "MEASure:SECondary:LIVEdata?"
+VOLTAGE_COMMAND = "SOURce:VOLTage:FIXed {voltage}"
+
+
+class SMU4201:
+    def __init__(self, instrument):
+        """
+        Wrap an open pyvisa resource.
+        Instrument settings (HV mode, output, compliance, range, ...) are cached in
+        self.state and a command is only sent when the setting actually changes.
+        """
+        self.instrument = instrument
+        self.combined_measure = True   # cleared if the instrument rejects compound queries
+        self.last_io_latency = 0.0
+        self.state = {}
+        # Time spent in instrument I/O ("io" events); the sweep worker adds its own.
+        self.perf = PerfCounters("smu")
+
+    def write(self, command):
+        start = time.perf_counter()
+        self.instrument.write(command)
+        self.perf.add("io", start, time.perf_counter() - start)
+
+    def query(self, command):
+        start = time.perf_counter()
+        response = self.instrument.query(command)
+        self.perf.add("io", start, time.perf_counter() - start)
+        return response
+
+    def set_state(self, key, value, command):
+        """
+        Send command only if the cached value of key differs from value.
+        Returns True if a command was sent.
+        """
+        if key in self.state and self.state[key] == value:
+            return False
+        # If the write fails the instrument state is unknown; drop the cached value.
+        self.state.pop(key, None)
+        self.write(command)
+        self.state[key] = value
+        return True
+
+    def invalidate(self):
+        """
+        Forget all cached state (after *RST, a reconnect, or an I/O error).
+        """
+        self.state.clear()
+
+    def reset(self):
+        """
+        Reset the instrument and wait for it to finish.
+        """
+        self.invalidate()
+        self.write("*RST")
+        self.wait_complete()
+
+    def close(self):
+        self.invalidate()
+        self.instrument.close()
+
+    def set_source_voltage_mode(self):
+        self.set_state("function", "VOLTage", "SOURce:FUNCtion:MODE VOLTage")
+
+    def set_current_limit(self, current_limit):
+        self.set_state("current_limit", current_limit, f"SOURce:VOLTage:CURRent:LIMit {current_limit}")
+
+    def set_current_range_auto(self, on=True):
+        self.set_state("current_range_auto", on, f"SOURce:VOLTage:RANGe:CURRent:AUTO {'ON' if on else 'OFF'}")
+
+    def set_measure_functions(self, primary="VOLTage", secondary="CURRent"):
+        self.set_state("measure_primary", primary, f"SOURce:VOLTage:MEASure:PRIMary {primary}")
+        self.set_state("measure_secondary", secondary, f"SOURce:VOLTage:MEASure:SECondary {secondary}")
+
+    def set_output(self, on):
+        self.set_state("output", on, f"OUTPut:STATe {'ON' if on else 'OFF'}")
+
+    def set_voltage(self, voltage):
+        self.set_state("voltage", voltage, VOLTAGE_COMMAND.format(voltage=voltage))
+
+    def measure(self, set_voltage=None):
+        """
+        Read measured voltage and current in a single transaction.
+        Returns (voltage, current, io_latency) with the latency in seconds.
+        If set_voltage is given (and differs from the cached setting) the
+        set-voltage command is pipelined into the same transaction.
+        Falls back to separate commands if compound queries are not supported,
+        i.e. if the reply is not two numbers (an instrument error reply included);
+        I/O errors (pyvisa) are raised.
+        """
+        prefix = ""
+        if set_voltage is not None and self.state.get("voltage") != set_voltage:
+            if self.combined_measure:
+                prefix = VOLTAGE_COMMAND.format(voltage=set_voltage) + ";:"
+            else:
+                self.set_voltage(set_voltage)
+        start = time.perf_counter()
+        if self.combined_measure:
+            try:
+                if prefix:
+                    self.state.pop("voltage", None)
+                voltage, current = (float(x) for x in self.query(prefix + MEASURE_QUERY).split(";"))
+                if prefix:
+                    self.state["voltage"] = set_voltage
+            except ValueError:
+                # Reply is not "voltage;current": the compound query was rejected.
+                self.combined_measure = False
+                try:
+                    self.instrument.clear()
+                except Exception:
+                    pass
+                if set_voltage is not None:
+                    self.set_voltage(set_voltage)
+                start = time.perf_counter()
+        if not self.combined_measure:
+            voltage = float(self.query(PRIMARY_QUERY))
+            current = float(self.query(SECONDARY_QUERY))
+        self.last_io_latency = time.perf_counter() - start
+        return voltage, current, self.last_io_latency
+
+    def wait_complete(self):
+        """
+        Block until the instrument has finished all pending commands (*OPC?).
+        """
+        self.query("*OPC?")
+
+    def wait_settled(self, tolerance=0.01, floor=1e-9, timeout=1.0, set_voltage=None):
+        """
+        Poll the live readings until two successive currents agree within
+        max(floor, tolerance * |I|), or until timeout seconds have passed.
+        set_voltage (optional) is sent together with the first reading.
+        Returns (voltage, current, io_latency, settle_time).
+        """
+        start = time.perf_counter()
+        voltage, current, io_latency = self.measure(set_voltage)
+        while True:
+            voltage, new_current, io_latency = self.measure()
+            settled = abs(new_current - current) <= max(floor, tolerance * abs(new_current))
+            current = new_current
+            if settled or time.perf_counter() - start >= timeout:
+                break
+        return voltage, current, io_latency, time.perf_counter() - start
+
+    def set_hv_mode(self, voltage):
+        """
+        Enable/disable HV state based on the voltage magnitude.
+        """
+        hv = 0 if abs(voltage) < HV_THRESHOLD else 1
+        self.set_state("hv", hv, f"SYSTem:MODE:HV:STATe {hv}")
+
+    def source_and_settle(self, voltage, tolerance=0.01, timeout=1.0):
+        """
+        Set HV mode and the voltage, then wait for the current to settle; one
+        instrument round trip fewer than set_voltage() followed by wait_settled().
+        Returns (voltage, current, io_latency, settle_time).
+        """
+        self.set_hv_mode(voltage)
+        return self.wait_settled(tolerance, timeout=timeout, set_voltage=voltage)
+
+    def step_list(self, voltages, dwell):
+        """
+        Point-by-point counterpart of run_list (same arguments and result): set
+        each voltage, hold it for dwell seconds and read it back.
+        """
+        results = np.empty((len(voltages), 2))
+        io_latency = 0.0
+        for k, voltage in enumerate(voltages):
+            self.set_hv_mode(voltage)
+            self.set_voltage(float(voltage))
+            time.sleep(dwell)
+            results[k, 0], results[k, 1], latency = self.measure()
+            io_latency += latency
+        self.last_io_latency = io_latency / max(len(voltages), 1)
+        return results
+
+    def run_list(self, voltages, dwell):
+        """
+        Upload a voltage list, trigger it once and bulk-read the buffered results.
+        All points must share one HV state (see split_list).
+        Returns an (N, 2) array of measured (voltage, current) pairs.
+        """
+        voltages = np.asarray(voltages, dtype=float)
+        self.set_hv_mode(np.abs(voltages).max())
+        self.set_state("voltage_mode", "LIST", LIST_COMMANDS["mode_list"])
+        self.write(LIST_COMMANDS["points"].format(values=",".join(f"{v:.6g}" for v in voltages)))
+        self.write(LIST_COMMANDS["dwell"].format(dwell=dwell))
+        self.write(LIST_COMMANDS["start"])
+        self.state.pop("voltage", None)
+
+        # The instrument answers *OPC? only once the whole list has run.
+        timeout = self.instrument.timeout
+        self.instrument.timeout = max(timeout, (len(voltages) * dwell + 5) * 1000)
+        try:
+            self.query(LIST_COMMANDS["wait"])
+        finally:
+            self.instrument.timeout = timeout
+
+        start = time.perf_counter()
+        data = np.array(self.query(LIST_COMMANDS["fetch"]).split(","), dtype=float)
+        self.last_io_latency = (time.perf_counter() - start) / len(voltages)
+        self.set_state("voltage_mode", "FIXed", LIST_COMMANDS["mode_fixed"])
+        return data.reshape(-1, 2)
+
+
+def split_list(voltages, max_points=LIST_MAX_POINTS):
+    """
+    Split a voltage list into chunks that each need a single HV state and fit in
+    one instrument list.
+    """
+    voltages = np.asarray(voltages, dtype=float)
+    hv = np.abs(voltages) >= HV_THRESHOLD
+    boundaries = np.nonzero(np.diff(hv))[0] + 1
+    chunks = []
+    for segment in np.split(voltages, boundaries):
+        for start in range(0, len(segment), max_points):
+            chunks.append(segment[start:start + max_points])
+    return chunks
@@ -0,0 +1,191 @@
+import numpy as np
+
+# =============================================================================
+# Step planners for the adaptive sweep.
+#
+# A planner is told every measured point of the current pass (in sweep order)
+# and returns the size of the next voltage step. SweepWorker clamps the last
+# step to the sweep end; planners only decide how far to go.
+#
+#   delta      the original rule: step shrinks with the last change in current
+#   curvature  fits a quadratic to the last few points of the compressed
+#              (signed log) current and places points where the slope or the
+#              curvature of the IV curve is large: the electron-retarding
+#              region and the knee at the plasma potential get dense points,
+#              the flat ion-saturation region gets the largest steps
+#
+# The coarse-then-refine sweep ("refine" mode) plans whole voltage lists
+# instead: coarse_voltages() spans the range with a few evenly spaced points,
+# refine_window() finds the floating potential (current zero crossing) and the
+# knee at the plasma potential in that scan, and refine_voltages() spends the
+# rest of the point budget between them, densest where the compressed
+# electron current changes fastest.
+# =============================================================================
+
+COARSE_POINTS = 31        # points of the coarse scan in refine mode
+POINT_BUDGET = 120        # total points per pass in refine mode
+REFINE_MARGIN = 2         # coarse steps added on both sides of the refine window
+
+
+class DeltaCurrentPlanner:
+    def __init__(self, sensitivity, base_step=0.25, min_step=0.025, max_step=0.5):
+        """
+        step = base_step * sensitivity / (sensitivity + |ΔI|), clamped to
+        [min_step, max_step]. sensitivity is in A.
+        """
+        self.sensitivity = sensitivity
+        self.base_step = base_step
+        self.min_step = min_step
+        self.max_step = max_step
+
+    def reset(self):
+        pass
+
+    def next_step(self, voltages, currents):
+        if len(currents) < 2:
+            return self.base_step
+        delta = abs(currents[-1] - currents[-2])
+        step = self.base_step * (self.sensitivity / (self.sensitivity + delta))
+        return max(self.min_step, min(step, self.max_step))
+
+
+class CurvaturePlanner:
+    def __init__(self, current_scale, base_step=0.25, min_step=0.025, max_step=1.0,
+                 window=5, slope_resolution=0.2, curvature_tolerance=0.02, growth=2.0):
+        """
+        The current is compressed as y = asinh(I / current_scale): linear for
+        |I| << current_scale, ln|I| above. From a quadratic fit to the last
+        window points the next step h is the largest one that keeps
+          |y'| h        <= slope_resolution       (resolve the exponential region)
+          |y''| h^2 / 2 <= curvature_tolerance    (error of a linear step at knees)
+        and grows by at most growth times the previous step.
+        """
+        self.current_scale = current_scale
+        self.base_step = base_step
+        self.min_step = min_step
+        self.max_step = max_step
+        self.window = window
+        self.slope_resolution = slope_resolution
+        self.curvature_tolerance = curvature_tolerance
+        self.growth = growth
+        self.step = base_step
+
+    def reset(self):
+        self.step = self.base_step
+
+    def local_derivatives(self, voltages, currents):
+        """
+        Slope and curvature of the compressed current at the last point.
+        """
+        v = np.asarray(voltages[-self.window:], dtype=float)
+        y = np.arcsinh(np.asarray(currents[-self.window:], dtype=float) / self.current_scale)
+        x = v - v[-1]
+        if len(x) >= 3:
+            c2, c1, _ = np.polyfit(x, y, 2)
+            return c1, 2 * c2
+        return (y[-1] - y[-2]) / (x[-1] - x[-2]), 0.0
+
+    def next_step(self, voltages, currents):
+        if len(currents) < 2:
+            self.step = self.base_step
+            return self.step
+        slope, curvature = self.local_derivatives(voltages, currents)
+        step = min(self.max_step, self.growth * self.step)
+        if abs(slope) > 0:
+            step = min(step, self.slope_resolution / abs(slope))
+        if abs(curvature) > 0:
+            step = min(step, np.sqrt(2 * self.curvature_tolerance / abs(curvature)))
+        self.step = float(max(self.min_step, step))
+        return self.step
+
+
+PLANNERS = {
+    "delta": "ΔI (last two points)",
+    "curvature": "Curvature (local fit)",
+}
+
+
+def current_scale(sensitivity):
+    """
+    Current (A) below which the planners treat the current as linear rather
+    than logarithmic.
+    """
+    return sensitivity / 10
+
+
+def make_planner(name, sensitivity):
+    """
+    Planner by name; sensitivity (A) sets the ΔI scale, or the current below
+    which the curvature planner treats the current as linear.
+    """
+    if name == "curvature":
+        return CurvaturePlanner(current_scale=current_scale(sensitivity))
+    if name == "delta":
+        return DeltaCurrentPlanner(sensitivity)
+    raise ValueError(f"Unknown step planner: {name}")
+
+
+def coarse_voltages(min_voltage, max_voltage, point_budget=POINT_BUDGET):
+    """
+    Evenly spaced voltages of the coarse scan: COARSE_POINTS, or half the
+    budget if that is smaller.
+    """
+    count = max(2, min(COARSE_POINTS, point_budget // 2))
+    return np.linspace(min_voltage, max_voltage, count)
+
+
+def electron_current(currents, scale):
+    """
+    Compressed electron current asinh((I - I_ion) / scale), with the most
+    negative current taken as the ion saturation current.
+    """
+    currents = np.asarray(currents, dtype=float)
+    return np.arcsinh((currents - min(currents.min(), 0.0)) / scale)
+
+
+def refine_window(voltages, currents, scale, margin=REFINE_MARGIN):
+    """
+    (start, stop) of the region worth refining in a coarse scan: from margin
+    coarse steps below the floating potential to margin steps above the knee
+    (the most negative curvature of the compressed electron current above
+    the floating potential, i.e. the plasma potential).
+    """
+    from langmuir_model import zero_crossing  # scipy; only needed in refine mode
+    order = np.argsort(voltages)
+    v = np.asarray(voltages, dtype=float)[order]
+    i = np.asarray(currents, dtype=float)[order]
+    step = np.median(np.diff(v))
+    v_f = zero_crossing(v, i)
+    knee = v_f
+    y = electron_current(i, scale)
+    curvature = y[:-2] - 2 * y[1:-1] + y[2:]
+    above = v[1:-1] > v_f
+    if np.any(above):
+        knee = v[1:-1][above][np.argmin(curvature[above])]
+    return max(v[0], v_f - margin * step), min(v[-1], knee + margin * step)
+
+
+def refine_voltages(voltages, currents, count, scale, margin=REFINE_MARGIN):
+    """
+    count voltages inside refine_window(), ascending. Half are spread evenly,
+    half in proportion to the slope of the compressed electron current, so
+    the exponential region and the knee get the densest points.
+    """
+    if count <= 0:
+        return np.empty(0)
+    start, stop = refine_window(voltages, currents, scale, margin)
+    if stop <= start:
+        return np.full(count, start)
+    order = np.argsort(voltages)
+    v = np.asarray(voltages, dtype=float)[order]
+    y = electron_current(np.asarray(currents, dtype=float)[order], scale)
+    grid = np.linspace(start, stop, 512)
+    slope = np.abs(np.gradient(np.interp(grid, v, y), grid))
+    # Point density as a cumulative distribution over the grid.
+    uniform = grid - start
+    weighted = np.concatenate(([0.0], np.cumsum((slope[1:] + slope[:-1]) / 2 * np.diff(grid))))
+    cdf = uniform / uniform[-1]
+    if weighted[-1] > 0:
+        cdf = 0.5 * cdf + 0.5 * weighted / weighted[-1]
+    targets = (np.arange(count) + 0.5) / count
+    return np.round(np.interp(targets, cdf, grid), 4)
@@ -0,0 +1,71 @@
+import numpy as np
+
+# =============================================================================
+# SweepAverager: running average of repeated IV sweeps on a fixed voltage grid.
+#
+# Each completed sweep is binned by set voltage (one mean current per bin per
+# sweep) and folded into per-bin running mean / variance with Welford's update,
+# so the cost of a new sweep does not depend on how many came before it.
+# =============================================================================
+
+
+class SweepAverager:
+    def __init__(self, min_voltage, max_voltage, bin_width):
+        """
+        Bins of width bin_width centred on min_voltage, min_voltage + bin_width, ...
+        """
+        self.min_voltage = min_voltage
+        self.bin_width = bin_width
+        n_bins = int(np.floor((max_voltage - min_voltage) / bin_width + 0.5)) + 1
+        self.centers = min_voltage + bin_width * np.arange(n_bins)
+        self.count = np.zeros(n_bins, dtype=np.int64)
+        self.mean = np.full(n_bins, np.nan)
+        self._m2 = np.zeros(n_bins)
+        self.n_sweeps = 0
+
+    def bin_sweep(self, voltages, currents):
+        """
+        Per-bin mean current of one sweep; NaN where the sweep has no points.
+        """
+        n_bins = len(self.centers)
+        index = np.rint((np.asarray(voltages) - self.min_voltage) / self.bin_width).astype(np.int64)
+        inside = (index >= 0) & (index < n_bins)
+        index, currents = index[inside], np.asarray(currents)[inside]
+        sums = np.bincount(index, weights=currents, minlength=n_bins)
+        hits = np.bincount(index, minlength=n_bins)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(hits > 0, sums / hits, np.nan)
+
+    def add_sweep(self, voltages, currents):
+        """
+        Fold one sweep into the running statistics. Returns its binned currents.
+        """
+        binned = self.bin_sweep(voltages, currents)
+        hit = ~np.isnan(binned)
+        self.count[hit] += 1
+        previous = np.where(self.count[hit] > 1, self.mean[hit], 0.0)
+        delta = binned[hit] - previous
+        self.mean[hit] = previous + delta / self.count[hit]
+        self._m2[hit] += delta * (binned[hit] - self.mean[hit])
+        self.n_sweeps += 1
+        return binned
+
+    @property
+    def std(self):
+        """
+        Per-bin sample standard deviation across sweeps (NaN below two sweeps).
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, np.sqrt(self._m2 / (self.count - 1)), np.nan)
+
+    def snapshot(self):
+        """
+        Copy of the current statistics, safe to hand to another thread.
+        """
+        return {
+            "centers": self.centers.copy(),
+            "mean": self.mean.copy(),
+            "std": self.std,
+            "count": self.count.copy(),
+            "n_sweeps": self.n_sweeps,
+        }
@@ -0,0 +1,641 @@
+import os
+import sys
+import time
+import queue
+import asyncio
+import argparse
+import threading
+import numpy as np
+from smu4201 import SMU4201, split_list
+from async_smu import AsyncSMU4201
+from simulated_smu import SimulatedSMU4201, is_simulated
+from step_planners import PLANNERS, POINT_BUDGET, make_planner, current_scale, coarse_voltages, refine_voltages
+from sample_buffer import SAMPLE_DTYPE, SAMPLE_FIELDS
+from sweep_average import SweepAverager
+from acquisition_log import AcquisitionLog, LOG_EXTENSION, convert_log_to_csv
+from run_file import RUN_EXTENSION, log_to_run
+
+# =============================================================================
+# sweep_engine: the acquisition loop as a plain Python library, without Qt.
+#
+# SweepEngine runs one instrument's sweep (configure, adaptive / list /
+# coarse + refine passes, pause/resume/stop, acquisition log) and reports
+# through callbacks, or as an iterator of samples:
+#
+#   engine = SweepEngine(open_smu(None, "SIM::INSTR"), 0.01, 40, 70, 5e-6)
+#   for timestamp, set_voltage, voltage, current, settle, io in engine.samples():
+#       ...
+#
+# The GUI's SweepWorker (main.py) is a thin QObject that turns the callbacks
+# into Qt signals. Run as a script it is a command-line front end for
+# unattended rigs (no PyQt, matplotlib or window needed):
+#
+#   python sweep_engine.py SIM::INSTR --min-voltage 40 --max-voltage 70 --mode refine -o run.ivrun
+# =============================================================================
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sweep_logs")
+RESOURCE_QUERY = "?*::INSTR"
+START_TIMEOUT = 60.0      # seconds a sweep waits for the others at a synchronized start
+_END = object()
+
+
+def discover_resources(rm, query=RESOURCE_QUERY):
+    """
+    VISA resource names of all instruments visible to the resource manager.
+    """
+    return list(rm.list_resources(query))
+
+
+def open_smu(rm, resource, timeout=10000):
+    """
+    Open one resource with the SMU4201 serial settings. Resource names starting
+    with "SIM" open a simulated instrument (no pyvisa needed, rm may be None).
+    """
+    if is_simulated(resource):
+        instrument = SimulatedSMU4201()
+    else:
+        instrument = rm.open_resource(resource)
+    instrument.timeout = timeout
+    instrument.write_termination = '\n'
+    instrument.read_termination = '\n'
+    smu = SMU4201(instrument)
+    smu.perf.name = resource
+    return smu
+
+
+# =============================================================================
+# SweepEngine: Performs an IV sweep on one instrument.
+# =============================================================================
+class SweepEngine:
+    # Callbacks, called on the thread that runs the sweep:
+    # on_sample(sample): a tuple (timestamp, set_voltage, voltage, current, settle_time, io_latency)
+    #                    each time a new measurement is obtained (see sample_buffer.SAMPLE_FIELDS).
+    # on_pass(block): a dict for every completed pass (index, direction,
+    #                 samples, running average).
+    # on_finished(): the sweep is complete (also after stop() or an error).
+    # on_error(message): an error occurred; the message is also kept in error_message.
+
+    def __init__(self, smu, current_limit, min_voltage, max_voltage, sensitivity,
+                 mode="adaptive", list_step=0.25, dwell=0.1,
+                 settle_tolerance=0.01, settle_timeout=1.0, log_path=None, metadata=None,
+                 repeat=1, bidirectional=False, start_barrier=None, planner="delta",
+                 point_budget=POINT_BUDGET, on_sample=None, on_pass=None, on_finished=None,
+                 on_error=None):
+        """
+        Initialize the SweepEngine with instrument parameters.
+        smu is the SMU4201 command layer wrapping the open instrument.
+        mode is "adaptive" (point-by-point, step size follows sensitivity),
+        "list" (fixed list_step, hardware-timed by the instrument's list engine
+        with dwell seconds per point) or "refine" (a coarse list scan, then
+        point_budget points in total spent between the floating potential and
+        the knee it located; sensitivity sets the current scale). On a real
+        instrument the lists are stepped through point by point, as the list
+        engine commands are not yet verified (see smu4201.LIST_COMMANDS).
+        In adaptive mode each point waits until successive current readings agree
+        within settle_tolerance (relative), or settle_timeout seconds.
+        If log_path is given every sample is also streamed to an AcquisitionLog.
+        metadata (e.g. probe geometry) is stored with the sweep parameters.
+        repeat is the number of back-to-back passes (0 = until stopped); the
+        instrument is configured once, and with bidirectional every other pass
+        runs max -> min. Completed passes are averaged on a list_step grid.
+        start_barrier (a threading.Barrier shared with the other instruments'
+        engines) makes the sweep start only once every instrument is configured.
+        planner names the adaptive step planner (see step_planners.PLANNERS).
+        """
+        self.smu = smu
+        self.current_limit = current_limit
+        self.min_voltage = min_voltage
+        self.max_voltage = max_voltage
+        self.sensitivity = sensitivity
+        self.mode = mode
+        self.list_step = list_step
+        self.dwell = dwell
+        self.settle_tolerance = settle_tolerance
+        self.settle_timeout = settle_timeout
+        self.log_path = log_path
+        self.log = None
+        self.metadata = metadata or {}
+        self.repeat = repeat
+        self.bidirectional = bidirectional
+        self.start_barrier = start_barrier
+        self.planner = planner
+        self.point_budget = point_budget
+        self.block = []
+        self.averager = None
+        # Timing counters shared with the instrument's I/O counters.
+        self.perf = smu.perf
+        self.emitted = 0
+        # Set while the sweep runs: its event loop and task, and the I/O queue.
+        self.loop = None
+        self.task = None
+        self.io = None
+        self._resume = None
+        self._paused = False
+        self._running = True
+        self.error_message = None
+        self.on_sample = on_sample
+        self.on_pass = on_pass
+        self.on_finished = on_finished
+        self.on_error = on_error
+
+    def run(self):
+        """
+        Perform the IV sweep; returns when it is complete. The sweep is a
+        coroutine run on an asyncio loop in this thread; instrument commands go
+        through an AsyncSMU4201 I/O thread, so pause and stop (callable from any
+        thread) take effect immediately.
+        """
+        try:
+            asyncio.run(self.run_sweep())
+        finally:
+            self.loop = None
+            if self.log is not None:
+                self.log.close()
+
+    async def run_sweep(self):
+        """
+        Configure the instrument once, then run the adaptive or the hardware
+        list sweep repeat times.
+        """
+        self._resume = asyncio.Event()
+        self.task = asyncio.current_task()
+        self.io = AsyncSMU4201(self.smu)
+        self.loop = asyncio.get_running_loop()
+        self.sync_pause()
+        try:
+            if not self._running:
+                raise asyncio.CancelledError()
+            if self.log_path:
+                self.log = AcquisitionLog(self.log_path, self.parameters())
+                self.log_path = self.log.path
+            await self.io.call(self.configure)
+            if self.start_barrier is not None:
+                try:
+                    await self.loop.run_in_executor(None, self.start_barrier.wait)
+                except threading.BrokenBarrierError:
+                    raise RuntimeError("Synchronized start aborted (another instrument failed).")
+            self.averager = SweepAverager(self.min_voltage, self.max_voltage, self.list_step)
+            index = 0
+            while self._running and (self.repeat == 0 or index < self.repeat):
+                upward = not (self.bidirectional and index % 2)
+                self.block = []
+                if self.mode == "list":
+                    await self.run_list_sweep(upward)
+                elif self.mode == "refine":
+                    await self.run_refine_sweep(upward)
+                else:
+                    await self.run_adaptive_sweep(upward)
+                if not self._running:
+                    break
+                self.complete_sweep(index, upward)
+                index += 1
+                
+            # Sweep completed; turn off output.
+            await self.io.call(self.smu.set_output, False)
+            self.close_log()
+            self.finish()
+            
+        except asyncio.CancelledError:
+            # Stopped: the command on the wire (if any) completes first.
+            try:
+                await self.io.call(self.smu.set_output, False)
+            except Exception:
+                pass
+            try:
+                self.close_log()
+            except RuntimeError as e:
+                self.report_error(e)
+            self.finish()
+        except Exception as e:
+            if self.start_barrier is not None:
+                # Do not leave the other instruments waiting for this one.
+                self.start_barrier.abort()
+            self.report_error(e)
+            try:
+                await self.io.call(self.smu.invalidate)
+                await self.io.call(self.smu.set_output, False)
+            except Exception:
+                pass
+            self.finish()
+        finally:
+            self.io.close()
+
+    @property
+    def hardware_list(self):
+        """
+        Whether voltage lists run on the instrument's list engine: only on the
+        simulator until the list commands are verified on an SMU4201.
+        """
+        return isinstance(self.smu.instrument, SimulatedSMU4201)
+
+    def report_error(self, error):
+        """Keep the error message and pass it to on_error."""
+        self.error_message = str(error)
+        if self.on_error is not None:
+            self.on_error(self.error_message)
+
+    def check_log(self):
+        """
+        Raise RuntimeError if the acquisition log could not be written.
+        """
+        if self.log is not None and self.log.error is not None:
+            raise RuntimeError(f"Acquisition log {self.log.path} could not be written: {self.log.error}")
+
+    def close_log(self):
+        """
+        Write out and close the acquisition log; raises RuntimeError if it failed.
+        """
+        if self.log is not None:
+            self.log.close()
+            self.check_log()
+
+    def parameters(self):
+        """
+        Sweep settings, stored alongside the data.
+        """
+        return {
+            "current_limit": self.current_limit,
+            "min_voltage": self.min_voltage,
+            "max_voltage": self.max_voltage,
+            "sensitivity": self.sensitivity,
+            "mode": self.mode,
+            "list_step": self.list_step,
+            "dwell": self.dwell,
+            "settle_tolerance": self.settle_tolerance,
+            "settle_timeout": self.settle_timeout,
+            "repeat": self.repeat,
+            "bidirectional": self.bidirectional,
+            "planner": self.planner,
+            "point_budget": self.point_budget,
+            "hardware_list": self.hardware_list,
+            "start_time": time.time(),
+            **self.metadata,
+        }
+
+    def emit_sample(self, sample):
+        """
+        Publish one sample to the acquisition log and the on_sample callback.
+        """
+        if self.log is not None:
+            self.check_log()
+            self.log.append(sample)
+        self.block.append(sample)
+        self.emitted += 1
+        if self.on_sample is not None:
+            self.on_sample(sample)
+
+    def complete_sweep(self, index, upward):
+        """
+        Fold the finished pass into the running average and publish it as a block.
+        """
+        samples = np.array(self.block, dtype=SAMPLE_DTYPE)
+        self.averager.add_sweep(samples["set_voltage"], samples["current"])
+        if self.on_pass is not None:
+            self.on_pass({
+                "index": index,
+                "direction": "up" if upward else "down",
+                "samples": samples,
+                "average": self.averager.snapshot(),
+            })
+
+    def finish(self):
+        """Report the end of the sweep."""
+        if self.on_finished is not None:
+            self.on_finished()
+
+    def configure(self):
+        """
+        Reset and configure the instrument.
+        """
+        self.smu.reset()
+        self.smu.set_source_voltage_mode()
+        self.smu.set_current_limit(self.current_limit)
+        self.smu.set_current_range_auto(True)
+        self.smu.set_measure_functions("VOLTage", "CURRent")
+        self.smu.wait_complete()
+        self.smu.set_output(True)
+        self.smu.wait_complete()
+
+    async def wait_if_paused(self):
+        """
+        Wait (without polling) while paused. Returns False if the sweep was stopped.
+        """
+        if not self._resume.is_set():
+            start = time.perf_counter()
+            await self._resume.wait()
+            self.perf.add("paused", start, time.perf_counter() - start)
+        return self._running
+
+    async def run_adaptive_sweep(self, upward=True):
+        """
+        Step through voltage values using an adaptive step-size
+        (min -> max, or max -> min when upward is False).
+        The step planner picks each step from the points measured so far.
+        """
+        start, stop = (self.min_voltage, self.max_voltage) if upward else (self.max_voltage, self.min_voltage)
+        direction = 1 if upward else -1
+        voltage = start
+        planner = make_planner(self.planner, self.sensitivity)
+        voltages, currents = [], []
+        
+        while self._running:
+            if not await self.wait_if_paused():
+                break
+            
+            # Set HV state (only when it changes) and the voltage, and read
+            # voltage and current once the current has settled. The voltage
+            # command travels in the same transaction as the first reading.
+            start = time.perf_counter()
+            meas_voltage, meas_current, io_latency, settle_time = await self.io.call(
+                self.smu.source_and_settle, voltage, self.settle_tolerance, self.settle_timeout,
+                timeout=self.settle_timeout + self.io.timeout)
+            self.perf.add("settle", start, settle_time)
+            self.emit_sample((time.time(), voltage, meas_voltage, meas_current, settle_time, io_latency))
+            
+            # Ask the planner for the next step size.
+            voltages.append(voltage)
+            currents.append(meas_current)
+            step = planner.next_step(voltages, currents)
+            
+            if voltage == stop:
+                break
+            voltage += direction * step
+            if (voltage - stop) * direction > 0:
+                voltage = stop
+
+    async def run_list_sweep(self, upward=True):
+        """
+        Upload the voltage list to the instrument and let it time the sweep.
+        """
+        voltages = np.arange(self.min_voltage, self.max_voltage + self.list_step / 2, self.list_step)
+        voltages = np.minimum(voltages, self.max_voltage)
+        if not upward:
+            voltages = voltages[::-1]
+        await self.run_voltage_list(voltages)
+
+    async def run_refine_sweep(self, upward=True):
+        """
+        Coarse-then-refine pass: a fast coarse list scan locates the floating
+        potential and the knee, then the rest of the point budget is measured
+        densely between them. Both scans are hardware-timed lists.
+        """
+        coarse = coarse_voltages(self.min_voltage, self.max_voltage, self.point_budget)
+        await self.run_voltage_list(coarse if upward else coarse[::-1])
+        if not self._running:
+            return
+        samples = np.array(self.block, dtype=SAMPLE_DTYPE)
+        fine = refine_voltages(samples["set_voltage"], samples["current"],
+                               self.point_budget - len(coarse), current_scale(self.sensitivity))
+        if len(fine):
+            await self.run_voltage_list(fine if upward else fine[::-1])
+
+    async def run_voltage_list(self, voltages):
+        """
+        Run a voltage list on the instrument's list engine, chunk by chunk so
+        pause/stop are honored between chunks; the next chunk is already queued
+        to the instrument while the current one is published. Without the list
+        engine (see hardware_list) every point is a chunk of its own.
+        """
+        if self.hardware_list:
+            run_list, chunks = self.smu.run_list, split_list(voltages)
+        else:
+            run_list, chunks = self.smu.step_list, split_list(voltages, max_points=1)
+        pending = None
+        for i, chunk in enumerate(chunks):
+            if pending is None:
+                if not await self.wait_if_paused():
+                    break
+                pending = self.io.submit(run_list, chunk, self.dwell)
+            start = time.perf_counter()
+            results = await self.io.wait(pending, len(chunk) * self.dwell + self.io.timeout, "run_list")
+            self.perf.add("list_chunk", start, time.perf_counter() - start)
+            io_latency = self.smu.last_io_latency
+            pending = None
+            if i + 1 < len(chunks) and self._resume.is_set() and self._running:
+                pending = self.io.submit(run_list, chunks[i + 1], self.dwell)
+            timestamp = time.time()
+            for set_voltage, (meas_voltage, meas_current) in zip(chunk, results):
+                self.emit_sample((timestamp, float(set_voltage), float(meas_voltage), float(meas_current),
+                                  self.dwell, io_latency))
+
+    def sync_pause(self):
+        """
+        Apply the pause flag to the resume event (runs on the sweep's event loop).
+        """
+        if self._paused:
+            self._resume.clear()
+        else:
+            self._resume.set()
+
+    def cancel(self):
+        """
+        Cancel the sweep task (runs on the sweep's event loop).
+        """
+        if self.start_barrier is not None:
+            self.start_barrier.abort()
+        task, self.task = self.task, None
+        if task is not None:
+            task.cancel()
+
+    def call_in_loop(self, callback):
+        """
+        Run callback on the sweep's event loop (from any thread), if it is running.
+        """
+        loop = self.loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(callback)
+            except RuntimeError:
+                pass  # loop already closed: the sweep has ended
+
+    def pause(self):
+        """Pause the sweep."""
+        self._paused = True
+        self.call_in_loop(self.sync_pause)
+
+    def resume(self):
+        """Resume the sweep."""
+        self._paused = False
+        self.call_in_loop(self.sync_pause)
+
+    def stop(self):
+        """Stop the sweep."""
+        self._running = False
+        self.call_in_loop(self.cancel)
+
+    def samples(self):
+        """
+        Run the sweep on a background thread and yield its samples as they
+        arrive. Leaving the loop early stops the sweep; an instrument error is
+        raised as RuntimeError once the samples before it have been yielded.
+        """
+        samples = queue.Queue()
+        on_sample = self.on_sample
+
+        def forward(sample):
+            if on_sample is not None:
+                on_sample(sample)
+            samples.put(sample)
+
+        def run():
+            try:
+                self.run()
+            finally:
+                samples.put(_END)
+
+        self.on_sample = forward
+        thread = threading.Thread(target=run, name="sweep", daemon=True)
+        thread.start()
+        try:
+            while True:
+                sample = samples.get()
+                if sample is _END:
+                    break
+                yield sample
+        finally:
+            self.stop()
+            thread.join()
+            self.on_sample = on_sample
+        if self.error_message is not None:
+            raise RuntimeError(self.error_message)
+
+
+# =============================================================================
+# Command-line entry point.
+# =============================================================================
+def output_path(output, index, count):
+    """
+    Output file of probe index (a _probe<i> suffix when there are several).
+    """
+    if count == 1:
+        return output
+    root, extension = os.path.splitext(output)
+    return f"{root}_probe{index}{extension}"
+
+
+def run_sweeps(smus, settings, log_dir=LOG_DIR, metadata=None, stream=None):
+    """
+    Sweep every SMU (resource -> SMU4201) concurrently with the same settings,
+    with a synchronized start when there are several. Samples are written to
+    one acquisition log per instrument and, if stream is a file, as CSV rows.
+    Ctrl+C stops all sweeps. Returns {resource: engine}.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    stamp = time.strftime("sweep_%Y%m%d_%H%M%S")
+    barrier = threading.Barrier(len(smus), timeout=START_TIMEOUT) if len(smus) > 1 else None
+    lock = threading.Lock()
+    engines, threads = {}, []
+    for index, (resource, smu) in enumerate(smus.items()):
+        log_path = os.path.join(log_dir, output_path(stamp + LOG_EXTENSION, index, len(smus)))
+
+        def on_sample(sample, index=index):
+            if stream is not None:
+                with lock:
+                    print(index, *sample, sep=",", file=stream)
+
+        def on_pass(block, resource=resource):
+            print(f"{resource}: pass {block['index'] + 1} ({block['direction']}) "
+                  f"{len(block['samples'])} points", file=sys.stderr)
+
+        def on_error(message, resource=resource):
+            print(f"{resource}: {message}", file=sys.stderr)
+
+        engines[resource] = SweepEngine(smu, **settings, log_path=log_path,
+                                        metadata=dict(metadata or {}, resource=resource),
+                                        start_barrier=barrier, on_sample=on_sample,
+                                        on_pass=on_pass, on_error=on_error)
+        threads.append(threading.Thread(target=engines[resource].run, name=resource, daemon=True))
+
+    if stream is not None:
+        print("probe," + ",".join(SAMPLE_FIELDS), file=stream)
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.2)
+    except KeyboardInterrupt:
+        print("Stopping...", file=sys.stderr)
+        for engine in engines.values():
+            engine.stop()
+        for thread in threads:
+            thread.join()
+    return engines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a Langmuir probe IV sweep without the GUI.")
+    parser.add_argument("resources", nargs="+", help='VISA resources to sweep, e.g. ASRL3::INSTR ("SIM::INSTR" = simulated)')
+    parser.add_argument("--min-voltage", type=float, required=True, help="sweep start (V)")
+    parser.add_argument("--max-voltage", type=float, required=True, help="sweep end (V)")
+    parser.add_argument("--current-limit", type=float, default=0.01, help="current compliance (A, default: 0.01)")
+    parser.add_argument("--sensitivity", type=float, default=5.0, help="adaptive sensitivity (uA, default: 5)")
+    parser.add_argument("--mode", choices=("adaptive", "list", "refine"), default="adaptive")
+    parser.add_argument("--planner", choices=sorted(PLANNERS), default="delta", help="adaptive step planner")
+    parser.add_argument("--list-step", type=float, default=0.25, help="list mode step (V, default: 0.25)")
+    parser.add_argument("--dwell", type=float, default=0.1, help="list dwell per point (s, default: 0.1)")
+    parser.add_argument("--point-budget", type=int, default=POINT_BUDGET, help="points per pass in refine mode")
+    parser.add_argument("--settle-tolerance", type=float, default=1.0, help="adaptive settle tolerance (%%, default: 1)")
+    parser.add_argument("--repeat", type=int, default=1, help="number of passes (0 = until Ctrl+C)")
+    parser.add_argument("--bidirectional", action="store_true", help="run every other pass max -> min")
+    parser.add_argument("--length", type=float, help="probe length (mm), stored with the data")
+    parser.add_argument("--radius", type=float, help="probe radius (mm), stored with the data")
+    parser.add_argument("--log-dir", default=LOG_DIR, help="directory of the acquisition logs")
+    parser.add_argument("-o", "--output", help=f"also save as CSV or run file ({RUN_EXTENSION}); "
+                                               "several instruments get a _probe<i> suffix")
+    parser.add_argument("--stream", action="store_true", help="print every sample as a CSV row to stdout")
+    args = parser.parse_args(argv)
+
+    if args.min_voltage >= args.max_voltage:
+        parser.error("--min-voltage must be less than --max-voltage")
+    settings = {
+        "current_limit": args.current_limit,
+        "min_voltage": args.min_voltage,
+        "max_voltage": args.max_voltage,
+        "sensitivity": args.sensitivity * 1e-6,
+        "mode": args.mode,
+        "list_step": args.list_step,
+        "dwell": args.dwell,
+        "settle_tolerance": args.settle_tolerance / 100,
+        "repeat": args.repeat,
+        "bidirectional": args.bidirectional,
+        "planner": args.planner,
+        "point_budget": args.point_budget,
+    }
+    metadata = {key: value for key, value in (("probe_length_mm", args.length), ("probe_radius_mm", args.radius))
+                if value is not None}
+
+    rm = None
+    if not all(is_simulated(resource) for resource in args.resources):
+        import pyvisa
+        rm = pyvisa.ResourceManager()
+    smus = {}
+    try:
+        for resource in args.resources:
+            smus[resource] = open_smu(rm, resource)
+        engines = run_sweeps(smus, settings, args.log_dir, metadata, sys.stdout if args.stream else None)
+    finally:
+        for smu in smus.values():
+            smu.close()
+
+    failed = 0
+    for index, (resource, engine) in enumerate(engines.items()):
+        logged = engine.log is not None and os.path.exists(engine.log_path)
+        print(f"{resource}: {engine.emitted} points, log {engine.log_path if logged else '(none)'}",
+              file=sys.stderr)
+        if engine.error_message is not None or not logged:
+            # The error has been reported; a failed sweep is not saved.
+            failed += 1
+            continue
+        if args.output:
+            path = output_path(args.output, index, len(engines))
+            if path.endswith(RUN_EXTENSION):
+                log_to_run(engine.log_path, path)
+            else:
+                convert_log_to_csv(engine.log_path, path)
+            print(f"{resource}: saved {path}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
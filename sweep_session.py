@@ -0,0 +1,204 @@
+import threading
+import numpy as np
+import pyvisa
+from PyQt5 import QtCore
+from simulated_smu import is_simulated
+from sweep_engine import START_TIMEOUT, discover_resources, open_smu
+from sample_buffer import SampleBuffer, SAMPLE_FIELDS
+
+# =============================================================================
+# SweepSession: several SMUs (one probe each) swept concurrently.
+#
+# Every instrument gets its own SweepWorker on its own QThread, so N probes
+# take the time of one sweep instead of N. With a synchronized start the
+# workers configure their instruments independently and then wait on a common
+# barrier, so the sweeps start together. The workers' signals are relayed with
+# the resource name of the instrument they came from, and SessionData merges
+# the streams into one timestamped data model.
+# =============================================================================
+
+class SessionData:
+    def __init__(self, names=()):
+        """
+        One SampleBuffer per source (instrument resource or loaded file), in order.
+        """
+        self.reset(names)
+
+    def reset(self, names):
+        self.buffers = {name: SampleBuffer() for name in names}
+
+    @property
+    def names(self):
+        return list(self.buffers)
+
+    def __getitem__(self, name):
+        return self.buffers[name]
+
+    def __len__(self):
+        return len(self.buffers)
+
+    def append(self, name, sample):
+        self.buffers[name].append(*sample)
+
+    def merged(self):
+        """
+        All samples in timestamp order as a dict of columns, plus a "probe"
+        column holding the index of the source in self.names.
+        """
+        columns = {field: np.concatenate([buffer.column(field) for buffer in self.buffers.values()])
+                   for field in SAMPLE_FIELDS}
+        probe = np.concatenate([np.full(len(buffer), index, dtype=np.int64)
+                                for index, buffer in enumerate(self.buffers.values())])
+        order = np.argsort(columns["timestamp"], kind="stable")
+        merged = {field: column[order] for field, column in columns.items()}
+        merged["probe"] = probe[order]
+        return merged
+
+
+class SweepSession(QtCore.QObject):
+    # Signals relayed from the workers, tagged with the instrument's resource name:
+    # new_data: (resource, sample tuple) for every new measurement.
+    # sweep_completed: (resource, block) for every completed pass.
+    # finished: emitted once all workers are done.
+    # error: emitted with the resource name prefixed to the message.
+    new_data = QtCore.pyqtSignal(str, tuple)
+    sweep_completed = QtCore.pyqtSignal(str, object)
+    finished = QtCore.pyqtSignal()
+    error = QtCore.pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.rm = None
+        self.smus = {}
+        self.workers = {}
+        self.threads = {}
+        self.pending = set()
+
+    @property
+    def names(self):
+        return list(self.smus)
+
+    @property
+    def running(self):
+        return any(thread.isRunning() for thread in self.threads.values())
+
+    def discover(self):
+        """
+        Resource names of the instruments that can be opened.
+        """
+        if self.rm is None:
+            self.rm = pyvisa.ResourceManager()
+        return discover_resources(self.rm)
+
+    def open(self, resources=None, timeout=10000):
+        """
+        Open the given VISA resources (all discovered instruments if none are
+        given). Previously opened instruments are closed first.
+        """
+        self.close()
+        if not resources:
+            resources = self.discover()
+        if not resources:
+            raise RuntimeError("No VISA instruments found.")
+        if self.rm is None and not all(is_simulated(resource) for resource in resources):
+            self.rm = pyvisa.ResourceManager()
+        try:
+            for resource in resources:
+                self.smus[resource] = open_smu(self.rm, resource, timeout)
+        except Exception:
+            self.close()
+            raise
+        return self.names
+
+    def start(self, make_worker, synchronized=True):
+        """
+        Create one worker per instrument with make_worker(resource, smu, start_barrier)
+        and start each on its own thread. Returns the workers by resource name.
+        """
+        barrier = threading.Barrier(len(self.smus), timeout=START_TIMEOUT) if synchronized and len(self.smus) > 1 else None
+        self.workers = {}
+        self.threads = {}
+        for resource, smu in self.smus.items():
+            worker = make_worker(resource, smu, barrier)
+            worker.resource = resource
+            thread = QtCore.QThread()
+            worker.moveToThread(thread)
+            worker.new_data.connect(self.relay_data)
+            worker.sweep_completed.connect(self.relay_sweep)
+            worker.error.connect(self.relay_error)
+            worker.finished.connect(self.worker_finished)
+            thread.started.connect(worker.run)
+            self.workers[resource] = worker
+            self.threads[resource] = thread
+        self.pending = set(self.workers)
+        for thread in self.threads.values():
+            thread.start()
+        return self.workers
+
+    def pause(self):
+        for worker in self.workers.values():
+            worker.pause()
+
+    def resume(self):
+        for worker in self.workers.values():
+            worker.resume()
+
+    def request_stop(self):
+        """
+        Ask all workers to stop without waiting; finished is emitted as usual
+        once they have turned their outputs off.
+        """
+        for worker in self.workers.values():
+            worker.stop()
+
+    def stop(self):
+        """
+        Stop all workers and wait for their threads to end.
+        """
+        for worker in self.workers.values():
+            worker.stop()
+        for thread in self.threads.values():
+            thread.quit()
+            thread.wait()
+
+    def close(self):
+        """
+        Stop any sweep, reset the instruments, turn their outputs off and close them.
+        """
+        self.stop()
+        for resource, smu in self.smus.items():
+            try:
+                smu.invalidate()
+                smu.write("*RST")
+                smu.set_output(False)
+                smu.close()
+            except Exception as e:
+                print(f"Error during disconnect ({resource}): {e}")
+        self.smus = {}
+
+    @QtCore.pyqtSlot(tuple)
+    def relay_data(self, sample):
+        self.new_data.emit(self.sender().resource, sample)
+
+    @QtCore.pyqtSlot(object)
+    def relay_sweep(self, block):
+        self.sweep_completed.emit(self.sender().resource, block)
+
+    @QtCore.pyqtSlot(str)
+    def relay_error(self, message):
+        self.error.emit(f"{self.sender().resource}: {message}")
+
+    @QtCore.pyqtSlot()
+    def worker_finished(self):
+        """
+        Quit the finished worker's thread; emit finished once all are done.
+        """
+        resource = self.sender().resource
+        thread = self.threads.get(resource)
+        if thread is not None:
+            thread.quit()
+            thread.wait()
+        if resource in self.pending:
+            self.pending.discard(resource)
+            if not self.pending:
+                self.finished.emit()
@@ -0,0 +1,38 @@
+import os
+import numpy as np
+from langmuir_model import LangmuirModel, zero_crossing
+from langmuir_fit import fit_sweep
+
+###########################################################################################
+
+# Auto Fit on the supplied sample data (voltage sweep 23) with the README's voltage range
+# and probe geometry. Run with: python -m pytest test_langmuir_fit.py
+
+###########################################################################################
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "voltage_current_data_23.csv")
+V_RANGE = (40.0, 70.0)
+L, R = 12.7, 0.8
+README_PARAMETERS = (0.9, 0.65e14, 55.35)   # T_ev, n_e, V_f entered by hand in the README
+
+
+def load_sample():
+    data = np.loadtxt(SAMPLE_PATH, delimiter=",", skiprows=1, usecols=(0, 1))
+    in_range = (data[:, 0] >= V_RANGE[0]) & (data[:, 0] <= V_RANGE[1])
+    return data[in_range]
+
+
+def test_sample_fit_floating_potential():
+    data = load_sample()
+    result = fit_sweep(data, L, R, v_range=V_RANGE)
+    # The best fit sits about 1.2 V above the measured zero crossing; the local
+    # minimum this guards against was 10 V below it.
+    assert abs(result["V_f"] - zero_crossing(data[:, 0], data[:, 1])) < 1.5
+
+
+def test_sample_fit_beats_readme_parameters():
+    data = load_sample()
+    result = fit_sweep(data, L, R, v_range=V_RANGE)
+    model = LangmuirModel(*README_PARAMETERS[:2], L, R, README_PARAMETERS[2])
+    readme_rmse = np.sqrt(np.nanmean((model.total_current(data[:, 0]) - data[:, 1])**2))
+    assert result["rmse"] < readme_rmse